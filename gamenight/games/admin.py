@@ -1,14 +1,15 @@
 from typing import cast
 
-from django import forms
+from django import forms, http, urls
 from django.contrib import admin
 from django.contrib.auth.admin import UserAdmin as DjangoUserAdmin
 from django.contrib.auth.forms import UserChangeForm as DjangoUserChangeForm
+from django.db import models
 from django.utils.translation import gettext_lazy as _
 
-from gamenight.games.widgets import Base64ImageWidget
+from gamenight.games.widgets import ImageWidget
 
-from .models import Fixture, Game, User
+from .models import Fixture, Game, User, utils
 
 
 class FixtureRankInline(admin.TabularInline):
@@ -22,6 +23,16 @@ class FixtureAdmin(admin.ModelAdmin):
     list_filter = ["game__name", ("ended", admin.EmptyFieldListFilter), "applied", "users"]
     ordering = ("-started",)
     readonly_fields = ("graph",)
+    actions = ("replay_scores",)
+
+    @admin.action(description="Replay scores from the earliest selected fixture")
+    def replay_scores(self, request: http.HttpRequest, queryset: models.QuerySet[Fixture]) -> None:
+        fixture = queryset.exclude(ended=None).order_by("ended").first()
+        if fixture is None:
+            self.message_user(request, "None of the selected fixtures have ended.")
+            return
+        utils.replay_scores(since=fixture)
+        self.message_user(request, f"Replayed scores from {fixture}.")
 
 
 @admin.register(Game)
@@ -39,11 +50,14 @@ class GameAdmin(admin.ModelAdmin):
 
 
 class UserChangeForm(DjangoUserChangeForm):
-    qrcode_img = forms.CharField(widget=Base64ImageWidget, required=False)
+    qrcode_img = forms.CharField(widget=ImageWidget, required=False)
 
     def __init__(self, *args, **kwargs) -> None:
         super().__init__(*args, **kwargs)
-        self.fields["qrcode_img"].initial = cast(User, self.instance).get_qrcode()
+        self.fields["qrcode_img"].initial = urls.reverse(
+            "users:qrcode",
+            kwargs={"username": cast(User, self.instance).username},
+        )
 
 
 @admin.register(User)
@@ -0,0 +1,107 @@
+"""A read-only JSON API of the leaderboard and the fixtures, for phones and the TV display.
+
+Responses are tagged with the version of the data they were built from, and the versions live
+in the cache, so a client polling with If-None-Match gets a 304 without touching the database.
+Tags are checked before logging in, which would read the session and user, so the private
+endpoints answer 304s without a query too. A 304 has no body, so it reveals nothing but the tag.
+Rows are read as values(), never as model instances.
+"""
+
+import uuid
+
+from django import http
+from django.contrib.auth import decorators as auth_decorators
+from django.db import transaction
+from django.db.models import F
+from django.utils import cache as cache_utils
+from django.views.decorators import http as http_decorators
+
+from gamenight.games import leaderboard, models, versions
+
+FIXTURES_VERSION_KEY = "api:fixtures:version"
+# The most fixtures that have ended to list.
+ENDED_LIMIT = 50
+FIXTURE_FIELDS = ("id", "started", "ended", "applied")
+FIXTURE_EXPRESSIONS = {"game_name": F("game__name"), "game_slug": F("game__slug")}
+
+
+def fixtures_version() -> int:
+    """Get the current version of the fixtures, and their ranks."""
+    return versions.get(FIXTURES_VERSION_KEY)
+
+
+def fixtures_changed() -> None:
+    """Bump the version of the fixtures once the surrounding transaction commits.
+
+    Bumping any earlier would let a client tag the old rows with the new version.
+    """
+    transaction.on_commit(lambda: versions.bump(FIXTURES_VERSION_KEY))
+
+
+def _leaderboard_etag(*_, **__) -> str:
+    return f"leaderboard-{leaderboard.version()}"
+
+
+def _fixtures_etag(*_, **__) -> str:
+    return f"fixtures-{fixtures_version()}"
+
+
+def _json(data: dict, *, private: bool = True) -> http.JsonResponse:
+    response = http.JsonResponse(data)
+    # Clients may keep the response, but must revalidate it before every use.
+    cache_utils.patch_cache_control(response, private=private, public=not private, no_cache=True)
+    return response
+
+
+@auth_decorators.login_not_required
+@http_decorators.require_safe
+@http_decorators.etag(_leaderboard_etag)
+def leaderboard_view(_: http.HttpRequest) -> http.JsonResponse:
+    """Serve the leaderboard, ordered by score. It is public, like the users page."""
+    return _json(
+        {"entries": [vars(entry) for entry in leaderboard.snapshot()]},
+        private=False,
+    )
+
+
+@auth_decorators.login_not_required
+@http_decorators.require_safe
+@http_decorators.etag(_fixtures_etag)
+@auth_decorators.login_required
+def fixtures_view(_: http.HttpRequest) -> http.JsonResponse:
+    """Serve the ongoing fixtures, and the last ENDED_LIMIT that ended, latest first."""
+    fixtures = models.Fixture.objects.values(*FIXTURE_FIELDS, **FIXTURE_EXPRESSIONS).order_by(
+        "-started",
+        "-id",
+    )
+    ongoing = list(fixtures.filter(ended=None))
+    ended = list(fixtures.exclude(ended=None)[:ENDED_LIMIT])
+    players: dict = {fixture["id"]: [] for fixture in [*ongoing, *ended]}
+    for fixture_id, username in (
+        models.Rank.objects.filter(fixture__in=players)
+        .order_by("user__username")
+        .values_list("fixture_id", "user__username")
+    ):
+        players[fixture_id].append(username)
+    for fixture in [*ongoing, *ended]:
+        fixture["players"] = players[fixture["id"]]
+    return _json({"ongoing": ongoing, "ended": ended})
+
+
+@auth_decorators.login_not_required
+@http_decorators.require_safe
+@http_decorators.etag(_fixtures_etag)
+@auth_decorators.login_required
+def fixture_view(_: http.HttpRequest, pk: uuid.UUID) -> http.JsonResponse:
+    """Serve a fixture, with the rank of every player."""
+    fixture = (
+        models.Fixture.objects.filter(pk=pk).values(*FIXTURE_FIELDS, **FIXTURE_EXPRESSIONS).first()
+    )
+    if fixture is None:
+        raise http.Http404
+    fixture["ranks"] = list(
+        models.Rank.objects.filter(fixture_id=pk)
+        .order_by("rank", "user__username")
+        .values("rank", "team", "delta", username=F("user__username")),
+    )
+    return _json(fixture)
@@ -19,3 +19,5 @@ class GamesConfig(AppConfig):
             ),
         )
         register_style("bootstrap5p", boostrap5p)
+
+        from gamenight.games import signals  # noqa: F401
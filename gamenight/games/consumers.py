@@ -1,14 +1,18 @@
+import json
 import logging
 
+from asgiref import sync
 from channels.generic import websocket  # type: ignore[import]
+from django.template import loader
 
-from gamenight.games import models
+from gamenight.games import leaderboard, models
 
 
 class UserScoreConsumer(websocket.AsyncWebsocketConsumer):
     async def connect(self) -> None:
         self.username = self.scope["url_route"]["kwargs"]["username"]
         await self.channel_layer.group_add(self.username, self.channel_name)
+        await self.channel_layer.group_add(models.user.SUMMARY_GROUP, self.channel_name)
         await self.accept()
         # Send the most recent update on connection.
         await self.user_score({})
@@ -16,27 +20,97 @@ class UserScoreConsumer(websocket.AsyncWebsocketConsumer):
     async def disconnect(self, close_code: str) -> None:
         logging.debug("Disconnected: %s", close_code)
         await self.channel_layer.group_discard(self.username, self.channel_name)
+        await self.channel_layer.group_discard(models.user.SUMMARY_GROUP, self.channel_name)
 
     async def receive(self, text_data: str) -> None:
         """When a user manually hits refresh.
 
-        We pass score=None to trigger a reload from the database.
+        The score is looked up once and broadcast to every client of the user. Refreshes within
+        REFRESH_INTERVAL of the last one are only answered on this socket, from the cache.
         """
         logging.debug("Received: %s", text_data)
+        if not await sync.sync_to_async(leaderboard.allow_refresh)(self.username):
+            await self.user_score({})
+            return
         await self.channel_layer.group_send(
             self.username,
-            {"type": "user.score", "score": None},
+            {"type": "user.score", "score": await self.get_score()},
         )
 
     async def user_score(self, event: dict) -> None:
         """Send the user's score to the client.
 
-        If we get the score, we send it. Otherwise, we fetch it from the database.
+        If we get the score, we send it. Otherwise, we look it up.
         """
         logging.debug("User score: %s", event)
-        if not (score := event.get("score")):
-            user = await models.User.objects.aget(username=self.username)
-            score = user.score
+        if (score := event.get("score")) is None:
+            score = await self.get_score()
         await self.send(
             text_data=f'<div id="{self.username}-score" class="sort-key">{score}</div>',
         )
+
+    async def leaderboard_changed(self, event: dict) -> None:
+        """Send the user's score, if it is part of a summary of bulk changes."""
+        if (score := event["scores"].get(self.username)) is not None:
+            await self.user_score({"score": score})
+
+    async def get_score(self) -> int | None:
+        return await sync.sync_to_async(leaderboard.score)(self.username)
+
+
+class LeaderboardConsumer(websocket.AsyncWebsocketConsumer):
+    """Pushes score and position changes for the rows of the leaderboard a client has loaded.
+
+    The page starts with the first page of rows, and the client sends the number of rows it has
+    whenever it loads more. Each frame only contains the loaded users whose score or position
+    changed since the last frame.
+    """
+
+    async def connect(self) -> None:
+        self.entries: dict[str, leaderboard.Entry] = {}
+        self.rows = leaderboard.PAGE_SIZE
+        await self.channel_layer.group_add(models.user.LEADERBOARD_GROUP, self.channel_name)
+        await self.channel_layer.group_add(models.user.SUMMARY_GROUP, self.channel_name)
+        await self.accept()
+        await self.send_changes()
+
+    async def disconnect(self, close_code: str) -> None:
+        logging.debug("Disconnected: %s", close_code)
+        await self.channel_layer.group_discard(models.user.LEADERBOARD_GROUP, self.channel_name)
+        await self.channel_layer.group_discard(models.user.SUMMARY_GROUP, self.channel_name)
+
+    async def receive(self, text_data: str) -> None:
+        """When the client loads more rows, or a user manually hits refresh.
+
+        Refreshing resends every loaded row.
+        """
+        logging.debug("Received: %s", text_data)
+        try:
+            data = json.loads(text_data)
+            self.rows = max(self.rows, int(data.get("rows", self.rows)))
+        except (AttributeError, TypeError, ValueError):
+            logging.warning("Invalid leaderboard message: %s", text_data)
+            return
+        await self.send_changes(resend=bool(data.get("refresh")))
+
+    async def leaderboard_changed(self, event: dict) -> None:
+        logging.debug("Leaderboard changed: %s", event)
+        await self.send_changes()
+
+    async def send_changes(self, *, resend: bool = False) -> None:
+        entries = await sync.sync_to_async(leaderboard.snapshot)()
+        # Rows stay on the page once loaded, even after their users drop out of the top rows.
+        loaded = [
+            entry
+            for position, entry in enumerate(entries)
+            if position < self.rows or entry.username in self.entries
+        ]
+        changed = [entry for entry in loaded if resend or self.entries.get(entry.username) != entry]
+        self.entries = {entry.username: entry for entry in loaded}
+        if changed:
+            await self.send(
+                text_data=loader.render_to_string(
+                    "chunk/leaderboard_update.html",
+                    {"entries": changed},
+                ),
+            )
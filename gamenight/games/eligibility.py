@@ -0,0 +1,60 @@
+"""An in-process index of the games that can be played by each number of players.
+
+The create fixture form looks games up on every change to its players, so the index is kept in
+memory, and rebuilt only when the version in the cache moves on. Saving or deleting a game
+bumps the version (see signals.py), so every process rebuilds its index on its next lookup.
+"""
+
+import threading
+
+from django.db import transaction
+
+from gamenight.games import models, versions
+
+VERSION_KEY = "eligibility:version"
+# Games are validated to at most this many players, so larger counts are rare enough to look up
+# on demand.
+MAX_PLAYERS = 50
+
+_lock = threading.Lock()
+_index: tuple[int, dict[int, list[models.Game]], list[models.Game]] | None = None
+
+
+def version() -> int:
+    """Get the current version of the games."""
+    return versions.get(VERSION_KEY)
+
+
+def games_changed() -> None:
+    """Expire every process's index, now and once the surrounding transaction commits.
+
+    Bumping now lets this connection see its own changes, and bumping again on commit stops
+    another process from indexing the old games under the new version.
+    """
+    versions.bump(VERSION_KEY)
+    transaction.on_commit(lambda: versions.bump(VERSION_KEY))
+
+
+def for_players(count: int) -> list[models.Game]:
+    """Get the games that can be played by the given number of players, by name."""
+    current = version()
+    index = _index
+    if index is None or index[0] != current:
+        index = _build(current)
+    if count in index[1]:
+        return index[1][count]
+    # can_play only needs the number of players.
+    return [game for game in index[2] if game.can_play(range(count))]
+
+
+def _build(current: int) -> tuple[int, dict[int, list[models.Game]], list[models.Game]]:
+    global _index  # noqa: PLW0603
+    with _lock:
+        if _index is None or _index[0] != current:
+            games = list(models.Game.objects.order_by("name"))
+            by_count = {
+                count: [game for game in games if game.can_play(range(count))]
+                for count in range(MAX_PLAYERS + 1)
+            }
+            _index = (current, by_count, games)
+        return _index
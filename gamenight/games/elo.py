@@ -0,0 +1,56 @@
+"""Vectorized ELO computations shared by fixtures, replays and simulations."""
+
+from collections.abc import Sequence
+
+import numpy as np
+import numpy.typing as npt
+
+# Players giving points to several others split them, but never give less than this per player.
+MINIMUM_SPLIT_DELTA = 5
+
+
+def pairwise_deltas(
+    ranks: Sequence[int],
+    scores: Sequence[float],
+    teams: Sequence[str],
+    *,
+    importance: float,
+    randomness: float,
+) -> npt.NDArray[np.int64]:
+    """Compute the points each player in a fixture gives every other player.
+
+    Entry [i, j] of the resulting matrix is the (positive) number of points player i gives to
+    player j, or zero when they do not trade points.
+    """
+    rank = np.asarray(ranks, dtype=np.int64)
+    score = np.asarray(scores, dtype=np.float64)
+    team = np.asarray(teams, dtype=str)
+    # Exponentiate once per player, using Python floats so the results are bit-for-bit identical
+    # to scalar ELO math (NumPy's SIMD power is not guaranteed to round the same way).
+    q = np.array([10 ** (value / 400) for value in scores], dtype=np.float64)
+    # Rows are sources (giving points), columns are targets (gaining points).
+    source_rank, target_rank = rank[:, None], rank[None, :]
+    source_score, target_score = score[:, None], score[None, :]
+    source_q, target_q = q[:, None], q[None, :]
+    # Sources are the players we have beaten, or drawn with at a *higher* score.
+    # If we draw with a player of a lower score, we give *them* points.
+    gives = (source_rank > target_rank) | (
+        (source_rank == target_rank) & (source_score > target_score)
+    )
+    # Players on the same team don't trade points.
+    gives &= ~((team[:, None] == team[None, :]) & (team[None, :] != ""))
+
+    target_expected = target_q / (target_q + source_q)
+    win_lose_draw = np.where(source_rank == target_rank, 0.5, 1.0)
+    delta = importance * (win_lose_draw - target_expected)
+    # A game's weight is reduced if the outcome is based on chance.
+    # IE, a coinflip game should have a lower weight than a game of darts.
+    if randomness:
+        delta *= 1 - (randomness / 2)
+    deltas = np.where(gives, np.trunc(delta), 0).astype(np.int64)
+    assert (deltas >= 0).all(), f"{deltas=}"
+
+    # Players giving points to several others split them between each of them.
+    arcs = np.count_nonzero(deltas, axis=1)[:, None]
+    split = np.maximum(deltas // np.maximum(arcs, 1), MINIMUM_SPLIT_DELTA)
+    return np.where((arcs > 1) & (deltas > 0), split, deltas)
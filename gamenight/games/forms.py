@@ -7,7 +7,7 @@ from django.templatetags import static
 from django.utils import safestring
 from iommi import html, views
 
-from gamenight.games import models
+from gamenight.games import eligibility, models, recommend
 
 
 def _fixture_update_form__finish__post_handler(
@@ -39,12 +39,17 @@ def _fixture_update_form_title(fixture: models.Fixture, **_) -> safestring.SafeS
 
 class FixtureUpdateForm(iommi.Form):
     game = iommi.Field.choice(
-        choices=lambda fixture, **_: models.Game.for_players(fixture.users.all()),
+        choices=lambda fixture, **_: eligibility.for_players(fixture.users.count()),
+        choice_id_formatter=lambda choice, **_: str(choice.pk),
         initial=lambda fixture, **_: fixture.game,
     )
     users = iommi.Field(
         extra_evaluated__group_ranks=lambda fixture, **_: fixture.get_grouped_ranks(),
         extra_evaluated__num_users=lambda fixture, **_: fixture.users.count(),
+        extra_evaluated__move_url=lambda fixture, **_: urls.reverse(
+            "fixtures:move",
+            kwargs={"fixture": fixture.pk},
+        ),
         initial=lambda fixture, **_: fixture.users.count(),
         template="chunk/rank_input.html",
         is_list=True,
@@ -105,18 +110,22 @@ class FixtureCreateForm(iommi.Form):
         display_name="1. Pick your players.",
         help_text="You need at least 2 available players to start a game.",
     )
-    game = iommi.Field.choice_queryset(
-        model=models.Game,
-        choices=lambda form, **_: models.Game.for_players(form.fields.users.raw_data or []),  # type: ignore[assignment]
-        is_valid=lambda form, parsed_data, request, **_: (
-            request.method == "GET" or parsed_data.can_play(form.fields.users.raw_data),
+    game = iommi.Field.choice(
+        choices=lambda form, **_: recommend.recommend(
+            form.fields.users.raw_data or [],
+            eligibility.for_players(len(form.fields.users.raw_data or [])),
+        ),
+        choice_id_formatter=lambda choice, **_: str(choice.pk),
+        # The choices only hold the games the players can play.
+        is_valid=lambda field, parsed_data, request, **_: (
+            request.method == "GET" or parsed_data in field.choices,
             "You do not have the right amount of players for this game!",
         ),
         label=lambda **_: html.h2(attrs__class={"mt-3": True}),
         display_name="2. Select the game.",
         choice_display_name_formatter=lambda choice,
         **_: f"{choice.name} (~{choice.estimated_duration}m)",
-        help_text="Shows games you can play with your selected players.",
+        help_text="Shows games you can play with your selected players, best matches first.",
     )
 
     class Meta:
@@ -0,0 +1,136 @@
+"""A cached snapshot of the leaderboard, refreshed write-through whenever scores change.
+
+Every refresh publishes the snapshot under a new version, and readers always look up the
+snapshot for the latest version, so a stale leaderboard is never served. Refreshes after a
+change only apply the changed scores to the previous snapshot, rather than reading every user.
+
+Individual scores are cached for a few seconds too, so refreshing a score does not hit the
+database every time, and refreshes are rate limited per user.
+"""
+
+import dataclasses
+from typing import TYPE_CHECKING
+
+from django.core.cache import cache
+
+from gamenight.games import models, versions
+
+if TYPE_CHECKING:
+    from collections.abc import Iterable
+
+VERSION_KEY = "leaderboard:version"
+SNAPSHOT_KEY = "leaderboard:snapshot:{version}"
+HITS_KEY = "leaderboard:hits"
+MISSES_KEY = "leaderboard:misses"
+# Snapshots are replaced on every change, so old versions only need to outlive slow readers.
+SNAPSHOT_TIMEOUT = 60 * 60 * 24
+SCORE_KEY = "leaderboard:score:{username}"
+SCORE_TIMEOUT = 10
+REFRESH_KEY = "leaderboard:refresh:{username}"
+REFRESH_INTERVAL = 2
+# The number of rows on each page of the leaderboard.
+PAGE_SIZE = 30
+
+
+@dataclasses.dataclass(frozen=True)
+class Entry:
+    position: int
+    username: str
+    score: int
+
+
+def build() -> list[Entry]:
+    """Build the leaderboard from the database, ordered by score.
+
+    Players with the same score share a position.
+    """
+    return _positioned(
+        models.User.objects.order_by("-score", "username").values_list("username", "score"),
+    )
+
+
+def version() -> int:
+    """Get the current version of the leaderboard, which also tags responses (see api.py)."""
+    return versions.get(VERSION_KEY)
+
+
+def snapshot() -> list[Entry]:
+    """Get the leaderboard, from the cache when possible."""
+    key = SNAPSHOT_KEY.format(version=version())
+    if (entries := cache.get(key)) is not None:
+        versions.incr(HITS_KEY)
+        return entries
+    versions.incr(MISSES_KEY)
+    entries = build()
+    cache.add(key, entries, timeout=SNAPSHOT_TIMEOUT)
+    return entries
+
+
+def refresh() -> list[Entry]:
+    """Rebuild the leaderboard and publish it under a new version."""
+    # Bump the version *before* building, so a slower concurrent refresh can never publish an
+    # older leaderboard under a newer version.
+    new_version = versions.bump(VERSION_KEY)
+    entries = build()
+    cache.set(SNAPSHOT_KEY.format(version=new_version), entries, timeout=SNAPSHOT_TIMEOUT)
+    return entries
+
+
+def update(scores: dict[str, int]) -> list[Entry]:
+    """Publish the leaderboard with the given scores changed, under a new version.
+
+    The scores are applied to the snapshot of the version before. If there is none (it expired,
+    or a concurrent refresh has not published it yet), the leaderboard is rebuilt instead, so
+    no other change is ever lost.
+    """
+    new_version = versions.bump(VERSION_KEY)
+    previous = cache.get(SNAPSHOT_KEY.format(version=new_version - 1))
+    if previous is None:
+        entries = build()
+    else:
+        merged = {entry.username: entry.score for entry in previous} | scores
+        entries = _positioned(sorted(merged.items(), key=lambda item: (-item[1], item[0])))
+    cache.set(SNAPSHOT_KEY.format(version=new_version), entries, timeout=SNAPSHOT_TIMEOUT)
+    return entries
+
+
+def stats() -> dict[str, float]:
+    """Get the hit rate of the leaderboard cache."""
+    hits = cache.get(HITS_KEY, 0)
+    misses = cache.get(MISSES_KEY, 0)
+    total = hits + misses
+    return {"hits": hits, "misses": misses, "hit_rate": hits / total if total else 0.0}
+
+
+def score(username: str) -> int | None:
+    """Get the score of a user, from the cache when possible."""
+    key = SCORE_KEY.format(username=username)
+    if (value := cache.get(key)) is None:
+        value = (
+            models.User.objects.filter(username=username).values_list("score", flat=True).first()
+        )
+        if value is not None:
+            cache.set(key, value, timeout=SCORE_TIMEOUT)
+    return value
+
+
+def cache_scores(scores: dict[str, int]) -> None:
+    """Write freshly read scores through to the cache."""
+    cache.set_many(
+        {SCORE_KEY.format(username=username): value for username, value in scores.items()},
+        timeout=SCORE_TIMEOUT,
+    )
+
+
+def allow_refresh(username: str) -> bool:
+    """Check whether a user may refresh their score, at most once every REFRESH_INTERVAL."""
+    return cache.add(REFRESH_KEY.format(username=username), value=True, timeout=REFRESH_INTERVAL)
+
+
+def _positioned(rows: "Iterable[tuple[str, int]]") -> list[Entry]:
+    """Give (username, score) rows, ordered by score, positions. Ties share a position."""
+    entries: list[Entry] = []
+    for i, (username, score) in enumerate(rows, start=1):
+        position = entries[-1].position if entries and entries[-1].score == score else i
+        entries.append(Entry(position=position, username=username, score=score))
+    return entries
@@ -0,0 +1,258 @@
+"""Benchmark the hot paths of the app, recording wall time and query counts.
+
+Every benchmark runs against an isolated in-memory cache and channel layer, and its database
+changes are rolled back, so the command is safe to run against a populated database:
+
+    python manage.py bench --output before.json
+    python manage.py bench --compare before.json
+"""
+
+import asyncio
+import contextlib
+import dataclasses
+import datetime
+import json
+import pathlib
+import random
+import statistics
+import subprocess
+import time
+from collections.abc import Callable, Iterator
+from typing import Any
+
+from asgiref import sync
+from channels import layers  # type: ignore[import]
+from django import test
+from django.conf import settings
+from django.core.management import base
+from django.db import connection, transaction
+
+from gamenight.games import models
+from gamenight.games.models import utils
+
+SIZES = {
+    "finish": [2, 4, 8, 20],
+    "replay": [1_000, 10_000],
+    "render": [100, 1_000, 10_000],
+    "fanout": [10, 100, 1_000],
+}
+QUICK_SIZES = {"finish": [2, 4], "replay": [20], "render": [10], "fanout": [10]}
+ISOLATED_SETTINGS = {
+    "CACHES": {"default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"}},
+    "CHANNEL_LAYERS": {"default": {"BACKEND": "channels.layers.InMemoryChannelLayer"}},
+}
+
+
+@dataclasses.dataclass
+class Result:
+    name: str
+    size: int
+    seconds: list[float]
+    queries: list[int]
+
+    @property
+    def median(self) -> float:
+        return statistics.median(self.seconds)
+
+
+class Rollback(Exception):  # noqa: N818
+    """Raised to roll back the data created by a benchmark."""
+
+
+@contextlib.contextmanager
+def rolled_back() -> Iterator[None]:
+    """Roll back every database change made inside the block."""
+    with contextlib.suppress(Rollback), transaction.atomic():
+        yield
+        raise Rollback
+
+
+@contextlib.contextmanager
+def timed(seconds: list[float], queries: list[int]) -> Iterator[None]:
+    """Record the wall time and number of queries of the block."""
+    count = 0
+
+    def wrapper(
+        execute: Callable[..., Any],
+        sql: str,
+        params: Any,  # noqa: ANN401
+        many: bool,  # noqa: FBT001
+        context: dict[str, Any],
+    ) -> Any:  # noqa: ANN401
+        nonlocal count
+        count += 1
+        return execute(sql, params, many, context)
+
+    with connection.execute_wrapper(wrapper):
+        start = time.perf_counter()
+        yield
+        seconds.append(time.perf_counter() - start)
+    queries.append(count)
+
+
+class Command(base.BaseCommand):
+    help = "Benchmark finishing fixtures, replaying scores, rendering pages and broadcasting."
+
+    def add_arguments(self, parser: base.CommandParser) -> None:
+        parser.add_argument("benchmarks", nargs="*", choices=list(SIZES), help="Default: all.")
+        parser.add_argument("--repeat", type=int, default=3, help="Runs per benchmark.")
+        parser.add_argument("--quick", action="store_true", help="Only run the smallest sizes.")
+        parser.add_argument("--output", type=pathlib.Path, help="Write the results as JSON.")
+        parser.add_argument("--compare", type=pathlib.Path, help="Compare with earlier results.")
+
+    def handle(self, *_, **options) -> None:
+        self.rng = random.Random(0)  # noqa: S311
+        sizes = QUICK_SIZES if options["quick"] else SIZES
+        benchmarks: dict[str, Callable[[int, int], list[Result]]] = {
+            "finish": self.bench_finish,
+            "replay": self.bench_replay,
+            "render": self.bench_render,
+            "fanout": self.bench_fanout,
+        }
+        results: list[Result] = []
+        with test.override_settings(**ISOLATED_SETTINGS):
+            for name in options["benchmarks"] or SIZES:
+                for size in sizes[name]:
+                    results.extend(self.run(benchmarks[name], size, options["repeat"]))
+        baseline = {}
+        if options["compare"]:
+            baseline = {
+                (r["name"], r["size"]): statistics.median(r["seconds"])
+                for r in json.loads(options["compare"].read_text())["results"]
+            }
+        for result in results:
+            line = f"{result.name:<16} {result.size:>6} {result.median:>10.4f}s {result.queries}"
+            if (before := baseline.get((result.name, result.size))) is not None:
+                line += f" ({result.median / before:.2f}x)"
+            self.stdout.write(line)
+        if options["output"]:
+            options["output"].write_text(
+                json.dumps(
+                    {
+                        "commit": self.commit(),
+                        "created": datetime.datetime.now(tz=datetime.UTC).isoformat(),
+                        "results": [dataclasses.asdict(r) for r in results],
+                    },
+                    indent=2,
+                ),
+            )
+            self.stdout.write(self.style.SUCCESS(f"Wrote results to {options['output']}"))
+
+    def run(
+        self,
+        benchmark: Callable[[int, int], list[Result]],
+        size: int,
+        repeat: int,
+    ) -> list[Result]:
+        with rolled_back():
+            return benchmark(size, repeat)
+
+    @staticmethod
+    def commit() -> str | None:
+        try:
+            return subprocess.run(  # noqa: S603
+                ["git", "rev-parse", "HEAD"],  # noqa: S607
+                cwd=settings.BASE_DIR,
+                capture_output=True,
+                check=True,
+                text=True,
+            ).stdout.strip()
+        except (OSError, subprocess.CalledProcessError):
+            return None
+
+    def make_users(self, n: int) -> list[models.User]:
+        return models.User.objects.bulk_create(
+            models.User(username=f"bench-{i:05}", score=self.rng.randint(500, 1500))
+            for i in range(n)
+        )
+
+    def make_game(self) -> models.Game:
+        return models.Game.objects.create(name="Benchmark", slug="benchmark", ranked=True)
+
+    def make_fixtures(
+        self,
+        game: models.Game,
+        users: list[models.User],
+        n: int,
+        players: int = 4,
+        *,
+        ended: bool = True,
+    ) -> list[models.Fixture]:
+        """Create n fixtures between random players, ranked at random."""
+        start = datetime.datetime(2024, 1, 1, tzinfo=datetime.UTC)
+        fixtures = models.Fixture.objects.bulk_create(
+            models.Fixture(
+                game=game,
+                ended=start + datetime.timedelta(minutes=i) if ended else None,
+            )
+            for i in range(n)
+        )
+        models.Rank.objects.bulk_create(
+            models.Rank(fixture=fixture, user=user, rank=rank)
+            for fixture in fixtures
+            for rank, user in enumerate(self.rng.sample(users, players), start=1)
+        )
+        return fixtures
+
+    def bench_finish(self, players: int, repeat: int) -> list[Result]:
+        game = self.make_game()
+        users = self.make_users(players)
+        result = Result("fixture.finish", players, [], [])
+        for fixture in self.make_fixtures(game, users, repeat, players, ended=False):
+            fixture.set_flat_ranks(fixture.get_flat_ranks())
+            with timed(result.seconds, result.queries):
+                fixture.finish()
+        return [result]
+
+    def bench_replay(self, fixtures: int, repeat: int) -> list[Result]:
+        self.make_fixtures(self.make_game(), self.make_users(50), fixtures)
+        result = Result("replay", fixtures, [], [])
+        for _ in range(repeat):
+            with timed(result.seconds, result.queries):
+                utils.recompute_all_scores()
+        return [result]
+
+    def bench_render(self, users: int, repeat: int) -> list[Result]:
+        players = self.make_users(users)
+        game = self.make_game()
+        self.make_fixtures(game, players, users // 8)
+        self.make_fixtures(game, players, users // 8, ended=False)
+        client = test.Client(HTTP_HOST=settings.HOST)
+        client.force_login(players[0])
+        results = []
+        for name, url in [("fixtures page", "/fixtures/"), ("users page", "/users/")]:
+            result = Result(name, users, [], [])
+            for _ in range(repeat):
+                with timed(result.seconds, result.queries):
+                    response = client.get(url)
+                assert response.status_code == 200, f"{url=}, {response.status_code=}"  # noqa: PLR2004
+            results.append(result)
+        return results
+
+    def bench_fanout(self, sockets: int, repeat: int) -> list[Result]:
+        """Broadcast score changes to every socket on the leaderboard."""
+        result = Result("fanout", sockets, [], [])
+        sync.async_to_sync(self._bench_fanout)(sockets, repeat, result)
+        return [result]
+
+    async def _bench_fanout(self, sockets: int, repeat: int, result: Result) -> None:
+        layer = layers.get_channel_layer()
+        broadcaster = models.user.UserBroadcaster()
+        channels = [await layer.new_channel() for _ in range(sockets)]
+        for i, channel in enumerate(channels):
+            await layer.group_add(f"bench-{i:05}", channel)
+            await layer.group_add(models.user.LEADERBOARD_GROUP, channel)
+        scores = {f"bench-{i:05}": i for i in range(sockets)}
+
+        async def receive(channel: str) -> None:
+            # Every socket gets its own score, and the leaderboard.
+            await layer.receive(channel)
+            await layer.receive(channel)
+
+        for _ in range(repeat):
+            start = time.perf_counter()
+            await broadcaster.send_scores(scores)
+            await broadcaster.send_leaderboard(scores)
+            await asyncio.gather(*(receive(channel) for channel in channels))
+            result.seconds.append(time.perf_counter() - start)
+            result.queries.append(0)
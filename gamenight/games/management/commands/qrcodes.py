@@ -1,17 +1,74 @@
+import json
 import pathlib
 
-import qrcode  # type: ignore[import]
 from django.conf import settings
 from django.core.management import base
 
-from gamenight.games import models
+from gamenight.games import models, qrcodes
+
+# Records the digest of every exported code, to find the codes that changed since.
+MANIFEST = ".manifest.json"
 
 
 class Command(base.BaseCommand):
-    def handle(self, *_, **__) -> None:
-        for user in models.User.objects.all():
-            url = user.get_qrcode()
-            img = qrcode.make(url)
-            pathlib.Path(settings.BASE_DIR / "qrcodes").mkdir(exist_ok=True)
-            img.save(settings.BASE_DIR / "qrcodes" / f"{user.username}.png")
-            self.stdout.write(self.style.SUCCESS(f"Created QR code for {user.username} ({url})"))
+    help = "Export every user's QR code as a PNG, and optionally as a printable sheet."
+
+    def add_arguments(self, parser: base.CommandParser) -> None:
+        parser.add_argument(
+            "--output",
+            type=pathlib.Path,
+            default=settings.BASE_DIR / "qrcodes",
+            help="The directory to write the PNGs to.",
+        )
+        parser.add_argument(
+            "--changed",
+            action="store_true",
+            help="Only write the codes that changed since the last export.",
+        )
+        parser.add_argument(
+            "--sheet",
+            type=pathlib.Path,
+            help="Also write every code to one printable .pdf, or to a .zip of PNGs.",
+        )
+        parser.add_argument("--workers", type=int, help="Default: one per CPU.")
+
+    def handle(self, *_, **options) -> None:
+        if options["sheet"] and options["sheet"].suffix not in {".pdf", ".zip"}:
+            raise base.CommandError("The sheet must be a .pdf or a .zip.")
+        output: pathlib.Path = options["output"]
+        output.mkdir(parents=True, exist_ok=True)
+        manifest_path = output / MANIFEST
+        manifest = json.loads(manifest_path.read_text()) if manifest_path.exists() else {}
+
+        users = list(models.User.objects.exclude(qrcode=""))
+        digests = {user.username: user.get_qrcode_digest() for user in users}
+        stale = [
+            user
+            for user in users
+            if not options["changed"]
+            or manifest.get(user.username) != digests[user.username]
+            or not (output / f"{user.username}.png").exists()
+        ]
+        pngs = dict(
+            zip(
+                [user.username for user in stale],
+                qrcodes.render_all([user.get_qrcode_url() for user in stale], options["workers"]),
+                strict=True,
+            ),
+        )
+        for username, png in pngs.items():
+            qrcodes.write_atomic(output / f"{username}.png", png)
+        qrcodes.write_atomic(manifest_path, json.dumps(digests, indent=2).encode())
+        self.stdout.write(
+            self.style.SUCCESS(f"Wrote {len(pngs)} of {len(users)} QR codes to {output}"),
+        )
+
+        if options["sheet"]:
+            codes = [
+                (username, pngs.get(username) or (output / f"{username}.png").read_bytes())
+                for username in digests
+            ]
+            qrcodes.write_sheet(options["sheet"], codes)
+            self.stdout.write(
+                self.style.SUCCESS(f"Wrote {len(codes)} QR codes to {options['sheet']}"),
+            )
@@ -0,0 +1,72 @@
+import dataclasses
+import itertools
+import json
+import pathlib
+
+from django.conf import settings
+from django.core.management import base
+
+from gamenight.games import models, simulation
+
+
+class Command(base.BaseCommand):
+    help = "Simulate seasons of every game, reporting how well the scores converge."
+
+    def add_arguments(self, parser: base.CommandParser) -> None:
+        parser.add_argument(
+            "--games",
+            type=pathlib.Path,
+            default=settings.BASE_DIR / "fixtures" / "games.json",
+            help="A fixture file of the games to simulate.",
+        )
+        parser.add_argument("--seasons", type=int, default=100)
+        parser.add_argument("--rounds", type=int, default=simulation.Season.rounds)
+        parser.add_argument("--players", type=int, default=simulation.Season.players)
+        parser.add_argument("--seed", type=int, default=0)
+        parser.add_argument("--workers", type=int, help="Default: one per CPU.")
+        parser.add_argument(
+            "--importance",
+            type=int,
+            nargs="+",
+            help="Importances to try instead of each game's own.",
+        )
+        parser.add_argument(
+            "--randomness",
+            type=float,
+            nargs="+",
+            help="Randomness factors to try instead of each game's own.",
+        )
+
+    def handle(self, *_, **options) -> None:
+        games = [
+            simulation.GameConfig.from_game(models.Game(**game["fields"]))
+            for game in json.loads(options["games"].read_text())
+        ]
+        configurations: dict[str, list[simulation.GameConfig]] = {"All games": games}
+        for game in games:
+            for importance, randomness in itertools.product(
+                options["importance"] or [game.importance],
+                options["randomness"] or [game.randomness],
+            ):
+                name = f"{game.name} (importance={importance}, randomness={randomness})"
+                configurations[name] = [
+                    dataclasses.replace(
+                        game,
+                        importance=importance,
+                        randomness=randomness,
+                    ),
+                ]
+        convergences = simulation.simulate(
+            configurations,
+            simulation.Season(players=options["players"], rounds=options["rounds"]),
+            seasons=options["seasons"],
+            seed=options["seed"],
+            workers=options["workers"],
+        )
+        width = max(map(len, configurations))
+        self.stdout.write(f"{'Configuration':<{width}}  Initial  Final (stdev)")
+        for convergence in sorted(convergences, key=lambda c: c.final):
+            self.stdout.write(
+                f"{convergence.name:<{width}}  {convergence.errors[0]:.4f}   "
+                f"{convergence.final:.4f} ({convergence.final_stdev:.4f})",
+            )
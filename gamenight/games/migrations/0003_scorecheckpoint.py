@@ -0,0 +1,46 @@
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("games", "0002_fixture_graph_rank_delta"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="ScoreCheckpoint",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "ended",
+                    models.DateTimeField(
+                        help_text="When the fixture ended, for ordering checkpoints.",
+                    ),
+                ),
+                (
+                    "scores",
+                    models.JSONField(help_text="The score of every user, keyed by user ID."),
+                ),
+                (
+                    "fixture",
+                    models.OneToOneField(
+                        help_text="The last fixture applied before the snapshot was taken.",
+                        on_delete=django.db.models.deletion.CASCADE,
+                        to="games.fixture",
+                    ),
+                ),
+            ],
+            options={
+                "ordering": ("ended", "fixture"),
+            },
+        ),
+    ]
@@ -0,0 +1,37 @@
+import django.db.models.deletion
+from django.apps.registry import Apps
+from django.db import migrations, models
+from django.db.backends.base.schema import BaseDatabaseSchemaEditor
+
+
+def set_active_fixtures(apps: Apps, _: BaseDatabaseSchemaEditor) -> None:
+    """Mark every user playing a fixture that has not ended."""
+    User = apps.get_model("games", "User")
+    Rank = apps.get_model("games", "Rank")
+    active = Rank.objects.filter(user=models.OuterRef("pk"), fixture__ended__isnull=True)
+    User.objects.update(
+        active_fixture=models.Subquery(active.order_by("-fixture__started").values("fixture")[:1]),
+    )
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("games", "0003_scorecheckpoint"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="user",
+            name="active_fixture",
+            field=models.ForeignKey(
+                blank=True,
+                editable=False,
+                help_text="The fixture the user is playing, if it has not ended.",
+                null=True,
+                on_delete=django.db.models.deletion.SET_NULL,
+                related_name="+",
+                to="games.fixture",
+            ),
+        ),
+        migrations.RunPython(set_active_fixtures, migrations.RunPython.noop),
+    ]
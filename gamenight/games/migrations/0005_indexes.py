@@ -0,0 +1,55 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("auth", "0012_alter_user_first_name_max_length"),
+        ("games", "0004_user_active_fixture"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="fixture",
+            index=models.Index(
+                condition=models.Q(("ended__isnull", True)),
+                fields=["-started"],
+                name="fixture_ongoing",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="fixture",
+            index=models.Index(
+                condition=models.Q(("ended__isnull", False)),
+                fields=["-started"],
+                name="fixture_ended",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="fixture",
+            index=models.Index(
+                condition=models.Q(("ended__isnull", False)),
+                fields=["ended", "id"],
+                name="fixture_replay",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="rank",
+            index=models.Index(fields=["fixture", "rank"], name="rank_fixture_rank"),
+        ),
+        migrations.AddIndex(
+            model_name="scorecheckpoint",
+            index=models.Index(fields=["ended", "fixture"], name="checkpoint_ended"),
+        ),
+        migrations.AddIndex(
+            model_name="user",
+            index=models.Index(fields=["-score", "username"], name="user_leaderboard"),
+        ),
+        migrations.AddIndex(
+            model_name="user",
+            index=models.Index(
+                condition=models.Q(("active_fixture__isnull", True)),
+                fields=["username"],
+                name="user_available",
+            ),
+        ),
+    ]
@@ -0,0 +1,34 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("games", "0005_indexes"),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name="fixture",
+            name="fixture_ongoing",
+        ),
+        migrations.RemoveIndex(
+            model_name="fixture",
+            name="fixture_ended",
+        ),
+        migrations.AddIndex(
+            model_name="fixture",
+            index=models.Index(
+                condition=models.Q(("ended__isnull", True)),
+                fields=["-started", "-id"],
+                name="fixture_ongoing",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="fixture",
+            index=models.Index(
+                condition=models.Q(("ended__isnull", False)),
+                fields=["-started", "-id"],
+                name="fixture_ended",
+            ),
+        ),
+    ]
@@ -0,0 +1,96 @@
+import django.db.models.deletion
+from django.apps.registry import Apps
+from django.conf import settings
+from django.db import migrations, models
+from django.db.backends.base.schema import BaseDatabaseSchemaEditor
+
+
+def build_stats(apps: Apps, _: BaseDatabaseSchemaEditor) -> None:
+    """Roll up every player's stats from the ranks of the applied fixtures."""
+    Rank = apps.get_model("games", "Rank")
+    UserGameStats = apps.get_model("games", "UserGameStats")
+    rows = (
+        Rank.objects.filter(fixture__applied=True)
+        .values("user_id", "fixture__game_id")
+        .annotate(
+            played=models.Count("pk"),
+            wins=models.Count("pk", filter=models.Q(rank=1)),
+            total_delta=models.Sum("delta"),
+            best_delta=models.Max("delta"),
+            worst_delta=models.Min("delta"),
+        )
+        .order_by()
+    )
+    UserGameStats.objects.bulk_create(
+        UserGameStats(user_id=row.pop("user_id"), game_id=row.pop("fixture__game_id"), **row)
+        for row in rows
+    )
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("games", "0006_fixture_keyset_indexes"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="UserGameStats",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "played",
+                    models.PositiveIntegerField(
+                        default=0,
+                        help_text="How many fixtures were played.",
+                    ),
+                ),
+                (
+                    "wins",
+                    models.PositiveIntegerField(default=0, help_text="How many fixtures were won."),
+                ),
+                (
+                    "total_delta",
+                    models.IntegerField(default=0, help_text="The net change in score."),
+                ),
+                (
+                    "best_delta",
+                    models.IntegerField(default=0, help_text="The largest change in score."),
+                ),
+                (
+                    "worst_delta",
+                    models.IntegerField(default=0, help_text="The smallest change in score."),
+                ),
+                (
+                    "game",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="+",
+                        to="games.game",
+                    ),
+                ),
+                (
+                    "user",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="game_stats",
+                        to=settings.AUTH_USER_MODEL,
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name_plural": "user game stats",
+                "constraints": [
+                    models.UniqueConstraint(fields=("user", "game"), name="unique_user_game_stats"),
+                ],
+            },
+        ),
+        migrations.RunPython(build_stats, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,89 @@
+import django.db.models.deletion
+from django.apps.registry import Apps
+from django.conf import settings
+from django.db import migrations, models
+from django.db.backends.base.schema import BaseDatabaseSchemaEditor
+
+# User.DEFAULT_SCORE
+DEFAULT_SCORE = 1000
+
+
+def build_history(apps: Apps, _: BaseDatabaseSchemaEditor) -> None:
+    """Rebuild every user's score history from the deltas of the applied fixtures."""
+    Rank = apps.get_model("games", "Rank")
+    ScorePoint = apps.get_model("games", "ScorePoint")
+    rows = (
+        Rank.objects.filter(fixture__applied=True)
+        .annotate(
+            total=models.Window(
+                models.Sum("delta"),
+                partition_by="user",
+                order_by=("fixture__ended", "fixture_id"),
+            ),
+        )
+        .values_list("user_id", "fixture_id", "fixture__ended", "total")
+    )
+    ScorePoint.objects.bulk_create(
+        (
+            ScorePoint(
+                user_id=user_id,
+                fixture_id=fixture_id,
+                at=ended,
+                score=DEFAULT_SCORE + total,
+            )
+            for user_id, fixture_id, ended, total in rows.iterator()
+        ),
+        batch_size=2000,
+    )
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("games", "0007_usergamestats"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="ScorePoint",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("at", models.DateTimeField(help_text="When the fixture ended.")),
+                ("score", models.IntegerField(help_text="The user's score after the fixture.")),
+                (
+                    "fixture",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="+",
+                        to="games.fixture",
+                    ),
+                ),
+                (
+                    "user",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="+",
+                        to=settings.AUTH_USER_MODEL,
+                    ),
+                ),
+            ],
+            options={
+                "indexes": [
+                    models.Index(
+                        fields=["user", "at"],
+                        include=("score",),
+                        name="score_point_user",
+                    ),
+                    models.Index(fields=["at"], include=("user", "score"), name="score_point_at"),
+                ],
+            },
+        ),
+        migrations.RunPython(build_history, migrations.RunPython.noop),
+    ]
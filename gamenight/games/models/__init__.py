@@ -1,6 +1,9 @@
+from .checkpoint import ScoreCheckpoint
 from .fixture import Fixture
 from .game import Game
+from .history import ScorePoint
 from .rank import Rank
+from .stats import UserGameStats
 from .user import User
 
-__all__ = ["Fixture", "Game", "Rank", "User"]
+__all__ = ["Fixture", "Game", "Rank", "ScoreCheckpoint", "ScorePoint", "User", "UserGameStats"]
@@ -0,0 +1,20 @@
+from django.db import models
+
+
+class ScoreCheckpoint(models.Model):
+    """A snapshot of every user's score, taken while replaying ended fixtures."""
+
+    fixture = models.OneToOneField(
+        "games.Fixture",
+        on_delete=models.CASCADE,
+        help_text="The last fixture applied before the snapshot was taken.",
+    )
+    ended = models.DateTimeField(help_text="When the fixture ended, for ordering checkpoints.")
+    scores = models.JSONField(help_text="The score of every user, keyed by user ID.")
+
+    class Meta:
+        ordering = ("ended", "fixture")
+        indexes = (models.Index(fields=["ended", "fixture"], name="checkpoint_ended"),)
+
+    def __str__(self) -> str:
+        return f"Checkpoint at {self.ended}"
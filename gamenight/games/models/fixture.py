@@ -2,19 +2,27 @@ import collections
 import datetime
 import json
 import logging
-import math
 import uuid
 import zoneinfo
 from typing import TYPE_CHECKING
 
 import networkx as nx
 from django import urls
-from django.db import models
+from django.db import models, transaction
+
+from gamenight.games import api, elo
+from gamenight.games.models.history import ScorePoint
+from gamenight.games.models.rank import Rank
+from gamenight.games.models.stats import UserGameStats
+from gamenight.games.models.user import User, score_broadcasts
 
 if TYPE_CHECKING:
+    from collections.abc import Hashable, Iterable, Sequence
+
+    import numpy as np
+    import numpy.typing as npt
+
     from gamenight.games.models.game import Game
-    from gamenight.games.models.rank import Rank
-    from gamenight.games.models.user import User
 
 
 class Fixture(models.Model):
@@ -39,6 +47,7 @@ class Fixture(models.Model):
     )
 
     rank_set: "models.QuerySet[Rank]"
+    _written_graph: str | None = None
 
     class Meta:
         constraints = (
@@ -47,24 +56,78 @@ class Fixture(models.Model):
                 check=~models.Q(applied=True) | models.Q(ended__isnull=False),
             ),
         )
+        indexes = (
+            # The ongoing and ended fixture tables, paged by (started, id).
+            models.Index(
+                fields=["-started", "-id"],
+                condition=models.Q(ended__isnull=True),
+                name="fixture_ongoing",
+            ),
+            models.Index(
+                fields=["-started", "-id"],
+                condition=models.Q(ended__isnull=False),
+                name="fixture_ended",
+            ),
+            # Replays, in the order fixtures ended.
+            models.Index(
+                fields=["ended", "id"],
+                condition=models.Q(ended__isnull=False),
+                name="fixture_replay",
+            ),
+        )
 
     def __str__(self) -> str:
         return f"{self.game} with {list(map(str, self.users.all()))}"
 
     def save(self, *args, **kwargs) -> None:
-        super().save(*args, **kwargs)
-        if self.graph:
-            ranks = {r.pk: r for r in self.rank_set.all()}
-            self.rank_set.update(delta=0)
-            for edge in json.loads(self.graph):
-                ranks[edge["source"]].delta -= edge["delta"]
-                ranks[edge["target"]].delta += edge["delta"]
-                self.rank_set.bulk_update(ranks.values(), ["delta"])
+        with transaction.atomic():
+            super().save(*args, **kwargs)
+            self._write_rank_deltas()
 
     def get_absolute_url(self) -> str:
         """Get the absolute URL of the fixture."""
         return urls.reverse("fixtures:detail", kwargs={"fixture": self.pk})
 
+    @classmethod
+    def from_db(cls, *args, **kwargs) -> "Fixture":
+        fixture = super().from_db(*args, **kwargs)
+        # Stored graphs have their deltas written to the ranks already. Deferred graphs are
+        # tracked once they are loaded (see refresh_from_db).
+        if "graph" in fixture.__dict__:
+            fixture._written_graph = fixture.graph  # noqa: SLF001
+        return fixture
+
+    def refresh_from_db(
+        self,
+        using: str | None = None,
+        fields: "Iterable[str] | None" = None,
+        from_queryset: "models.QuerySet[Fixture] | None" = None,
+    ) -> None:
+        fields = None if fields is None else list(fields)
+        super().refresh_from_db(using=using, fields=fields, from_queryset=from_queryset)
+        if fields is None or "graph" in fields:
+            self._written_graph = self.graph
+
+    def _write_rank_deltas(self) -> None:
+        """Write the deltas of the graph to the ranks, in one query.
+
+        Nothing is written while the graph is the one written last, so saving a fixture whose
+        graph has not changed does not touch its ranks.
+        """
+        if not self.graph or self.graph == self._written_graph:
+            return
+        deltas: dict[int, int] = collections.defaultdict(int)
+        for edge in json.loads(self.graph):
+            deltas[edge["source"]] -= edge["delta"]
+            deltas[edge["target"]] += edge["delta"]
+        self.rank_set.update(
+            delta=models.Case(
+                *(models.When(pk=pk, then=delta) for pk, delta in deltas.items()),
+                default=0,
+            ),
+        )
+        self._written_graph = self.graph
+
     @staticmethod
     def create(game: "Game", users: "list[User]") -> "Fixture":
         """Create a fixture."""
@@ -105,92 +168,121 @@ class Fixture(models.Model):
         """
         return [
             f"{rank.rank}--{rank.user.username}--{rank.team}"
-            for rank in self.rank_set.all().order_by("rank", "user__username")
+            for rank in self.rank_set.select_related("user").order_by("rank", "user__username")
         ]
 
     def set_flat_ranks(self, ranks: list[str]) -> None:
-        """Update ranks based on the flat ranks from the HTML form."""
-        max_rank = self.get_max_rank()
+        """Update ranks based on the flat ranks from the HTML form.
+
+        Every rank is validated before any is written, the changed ones are written in one
+        query, and the graph is only rebuilt if the ranking changed.
+        """
+        current = {rank.user.username: rank for rank in self.rank_set.select_related("user")}
+        max_rank = len(current) if self.game.ranked else 2
         team_ranks: dict[str, str] = {}
+        changed = []
         for combined in ranks:
             rank, user, team = combined.split("--", 2)
             assert rank.isdigit(), f"{rank=}"
             assert int(rank) <= max_rank, f"{rank=}"
+            assert user in current, f"{user=}"
             # Guarantee team players are ranked together.
             if team:
                 if team not in team_ranks:
                     team_ranks[team] = rank
                 else:
                     assert team_ranks[team] == rank, f"{team_ranks=}"
-            updated = self.rank_set.filter(user__username=user).update(rank=int(rank), team=team)
-            assert updated == 1, f"{updated=}"
-        if not self.rank_set.filter(rank=0).exists():
-            self._build_player_graph()
+            instance = current[user]
+            if (instance.rank, instance.team) != (int(rank), team):
+                instance.rank, instance.team = int(rank), team
+                changed.append(instance)
+        self._write_ranks(list(current.values()), changed)
+
+    def move_rank(self, username: str, rank: int, team: str) -> set[int]:
+        """Move one player to a rank, and onto a team, as they are dragged in the ranking form.
+
+        Their teammates move with them, so a team is always ranked together. As in the form, all
+        players cannot be on the same team. Returns the ranks whose players changed, before and
+        after the move.
+        """
+        if self.ended is not None:
+            msg = "The fixture has ended."
+            raise ValueError(msg)
+        current = {rank.user.username: rank for rank in self.rank_set.select_related("user")}
+        max_rank = len(current) if self.game.ranked else 2
+        if username not in current:
+            msg = f"{username} is not playing this fixture."
+            raise ValueError(msg)
+        if not 0 <= rank <= max_rank:
+            msg = f"The rank must be between 0 and {max_rank}."
+            raise ValueError(msg)
+        affected = set()
+        changed = []
+        for instance in current.values():
+            if instance.user.username == username:
+                new = (rank, team)
+            elif team and instance.team == team:
+                new = (rank, instance.team)
+            else:
+                continue
+            if (instance.rank, instance.team) != new:
+                affected.update({instance.rank, rank})
+                instance.rank, instance.team = new
+                changed.append(instance)
+        teams = {instance.team for instance in current.values()}
+        if teams != {""} and len(teams) == 1:
+            msg = "All players cannot be on the same team."
+            raise ValueError(msg)
+        self._write_ranks(list(current.values()), changed)
+        return affected
+
+    def _write_ranks(self, ranks: "list[Rank]", changed: "list[Rank]") -> None:
+        """Write the changed ranks in one query, then rebuild the graph if the ranking changed."""
+        Rank.objects.bulk_update(changed, ["rank", "team"])
+        if changed:
+            api.fixtures_changed()
+        if (changed or not self.graph) and all(rank.rank for rank in ranks):
+            self._build_player_graph(ranks)
 
     def finish(self) -> str:
-        """Finish the fixture."""
+        """Finish the fixture.
+
+        The fixture, and the users playing it, are locked until the scores are updated, so
+        finishing twice, or finishing fixtures with the same players at once, loses no updates.
+        """
         assert self.rank_set.filter(rank=0).count() == 0, "there are some unranked players!"
-        self.refresh_from_db()
-        if self.ended is None:
-            logging.debug("Finishing fixture: %s", self.pk)
-            self.ended = datetime.datetime.now(tz=zoneinfo.ZoneInfo("America/New_York"))
-            self.save(update_fields=["ended"])
-            self._apply_player_graph()
-            self.save(update_fields=["applied"])
+        with transaction.atomic():
+            self.refresh_from_db(from_queryset=Fixture.objects.select_for_update(no_key=True))
+            if self.ended is None:
+                logging.debug("Finishing fixture: %s", self.pk)
+                # Lock in a consistent order, so overlapping fixtures cannot deadlock.
+                players = User.objects.filter(rank__fixture=self).order_by("pk")
+                list(players.select_for_update(no_key=True, of=("self",)))
+                self.ended = datetime.datetime.now(tz=zoneinfo.ZoneInfo("America/New_York"))
+                self._apply_player_graph()
+                self.save(update_fields=["ended", "applied", "graph"])
         return self.get_absolute_url()
 
-    def reapply(self) -> None:
-        """Reapply the ELO updates."""
-        self.applied = False
-        self._apply_player_graph()
-        self.refresh_from_db()
-
-    def _build_player_graph(self) -> nx.DiGraph:
+    def _build_player_graph(self, ranks: "list[Rank] | None" = None) -> nx.DiGraph:
         """Build the graph of the players in the fixture.
 
         For every edge (m, n) in the resultant DAG, n gives a non-zero sumo of points to m.
+        The ranks (and their users) are loaded in one query, unless they are given, and every edge
+        is computed in memory.
         """
-        assert self.rank_set.count() > 1, "Cannot build a graph with less than two players."
-        assert not self.rank_set.filter(rank=0).exists(), "Cannot rank unset players."
-        graph = nx.DiGraph()
-        # Gainers are those gaining points, where losers are ones giving up points.
-        for target in self.rank_set.all().order_by("rank", "user__score"):
-            sources = (
-                # We exclude ourself.
-                self.rank_set.exclude(pk=target.pk)
-                # As well as any players we have drawn with of *lower or equal* score.
-                # If we draw with a player of a lower score, we give *them* points.
-                .exclude(
-                    models.Q(rank=target.rank) & models.Q(user__score__lte=target.user.score),
-                )
-                # Find all the players we have beaten.
-                .filter(rank__gte=target.rank)
-            )
-            # Lastly, remove players on the same team (they don't trade points).
-            if target.team:
-                sources = sources.exclude(team=target.team)
-            for source in sources:
-                assert target.rank <= source.rank, f"{target.rank=} {source.rank=}"
-                delta = _elo_delta(
-                    self.game,
-                    source.rank,
-                    source.user.score,
-                    target.rank,
-                    target.user.score,
-                )
-                if delta == 0:
-                    continue
-                assert delta > 0, f"{delta=}, {target=}, {source=}"
-                graph.add_edge(
-                    source,
-                    target,
-                    delta=delta,
-                )
-        for node in graph.nodes:
-            arcs = graph.edges(node, data=True)
-            if len(arcs) > 1:
-                for arc in arcs:
-                    graph[arc[0]][arc[1]]["delta"] = max(arc[2]["delta"] // len(arcs), 5)
+        if ranks is None:
+            ranks = list(self.rank_set.select_related("user"))
+        ranks = sorted(ranks, key=lambda rank: (rank.rank, rank.user.score, rank.pk))
+        assert len(ranks) > 1, "Cannot build a graph with less than two players."
+        assert all(rank.rank for rank in ranks), "Cannot rank unset players."
+        deltas = elo.pairwise_deltas(
+            [rank.rank for rank in ranks],
+            [rank.user.score for rank in ranks],
+            [rank.team for rank in ranks],
+            importance=self.game.importance,
+            randomness=self.game.randomness,
+        )
+        graph = player_graph(ranks, deltas)
         self.graph = json.dumps(
             [
                 {"source": source.pk, "target": target.pk, "delta": data["delta"]}
@@ -200,53 +292,58 @@ class Fixture(models.Model):
         return graph
 
     def _apply_player_graph(self) -> None:
-        """Apply the deltas from the players graph."""
+        """Apply the deltas from the players graph, incrementing every score in one query.
+
+        The players' stats for the game are updated with the result too, and their new scores
+        are appended to their score history.
+        """
         if self.applied:
             logging.info("ELO updates already applied.")
             return
         graph = self._build_player_graph()
-        deltas: dict[Rank, int] = collections.defaultdict(int)
+        deltas: dict[User, int] = collections.defaultdict(int)
         for source, target, data in graph.edges(data=True):
             delta = data["delta"]
             assert source != target
             assert delta > 0, f"{delta=}"
-            deltas[source] -= delta
-            deltas[target] += delta
-        for rank, delta in deltas.items():
-            rank.user.score += delta
-            rank.user.save()
+            deltas[source.user] -= delta
+            deltas[target.user] += delta
+        User.objects.filter(pk__in=[user.pk for user in deltas]).update(
+            score=models.F("score")
+            + models.Case(
+                *(models.When(pk=user.pk, then=delta) for user, delta in deltas.items()),
+                default=0,
+            ),
+        )
+        for user, delta in deltas.items():
+            user.score += delta
+        score_broadcasts.add(*(user.username for user in deltas))
+        UserGameStats.record(
+            self.game,
+            (
+                (
+                    rank.user_id,
+                    rank.rank,
+                    graph.in_degree(rank, "delta") - graph.out_degree(rank, "delta"),
+                )
+                for rank in graph.nodes
+            ),
+        )
+        assert self.ended is not None, "only ended fixtures can be applied"
+        ScorePoint.objects.bulk_create(
+            ScorePoint(user=rank.user, fixture=self, at=self.ended, score=rank.user.score)
+            for rank in graph.nodes
+        )
         self.applied = True
 
 
-def _elo_delta(
-    game: "Game",
-    source_rank: int,
-    source_score: float,
-    target_rank: int,
-    target_score: float,
-) -> int:
-    """Compute the ELO update for two players."""
-    target_q = 10 ** (target_score / 400)
-    source_q = 10 ** (source_score / 400)
-    target_expected = target_q / (target_q + source_q)
-    source_expected = source_q / (target_q + source_q)
-    assert math.isclose(
-        target_expected + source_expected,
-        1,
-        abs_tol=1e-6,
-    ), f"{target_expected=} {source_expected=}"
-    delta = game.importance * (_win_lose_draw(target_rank, source_rank) - target_expected)
-    # A game's weight is reduced if the outcome is based on chance.
-    # IE, a coinflip game should have a lower weight than a game of darts.
-    if game.randomness:
-        delta *= 1 - (game.randomness / 2)
-    return math.trunc(delta)
-
-
-def _win_lose_draw(rank_one: int, rank_two: int) -> float:
-    """Compute the win/lose/draw probability."""
-    if rank_one == rank_two:
-        return 0.5
-    if rank_one < rank_two:
-        return 1
-    return 0
+def player_graph(nodes: "Sequence[Hashable]", deltas: "npt.NDArray[np.int64]") -> nx.DiGraph:
+    """Build the graph of the players from a matrix of pairwise ELO deltas."""
+    graph = nx.DiGraph()
+    # Every player is a node, even if they trade no points.
+    graph.add_nodes_from(nodes)
+    # Gainers are those gaining points, where losers are ones giving up points.
+    for j, target in enumerate(nodes):
+        for i in deltas[:, j].nonzero()[0]:
+            graph.add_edge(nodes[i], target, delta=int(deltas[i, j]))
+    return graph
@@ -0,0 +1,65 @@
+import collections
+import datetime
+from typing import Self
+
+from django.db import models
+from django.db.models import functions
+
+
+class ScorePointQuerySet(models.QuerySet):
+    def last_points(self, n: int) -> Self:
+        """Keep each user's last n points."""
+        return self.annotate(
+            recency=models.Window(
+                functions.RowNumber(),
+                partition_by="user",
+                order_by=("-at", "-id"),
+            ),
+        ).filter(recency__lte=n)
+
+    def bucketed(self, kind: str) -> Self:
+        """Keep each user's last point in every bucket of time, e.g. every "hour" or "day"."""
+        return (
+            self.annotate(bucket=functions.Trunc("at", kind))
+            .order_by("user_id", "bucket", "-at", "-id")
+            .distinct("user_id", "bucket")
+        )
+
+    def series(self) -> dict[int, list[tuple[datetime.datetime, int]]]:
+        """Group the points into a series per user ID, oldest first."""
+        series = collections.defaultdict(list)
+        # Not values_list, which would drop the bucket that points are distinct on.
+        for point in self.only("user_id", "at", "score"):
+            series[point.user_id].append((point.at, point.score))
+        return {user_id: sorted(points) for user_id, points in series.items()}
+
+
+class ScorePoint(models.Model):
+    """A user's score after a fixture was applied, for drawing their rating over time.
+
+    Points are only ever appended (and rewritten by replays), and rows are kept narrow: the
+    indexes cover the score, so a chart is read from the index alone.
+
+    Points are not packed into a compact encoding, such as a delta-encoded array per user.
+    Finishing a fixture would then rewrite every player's array rather than insert a row each,
+    replays could not delete and rewrite a range of points, and everyone's chart over a range of
+    time could not be read with one index range scan.
+    """
+
+    user = models.ForeignKey("games.User", on_delete=models.CASCADE, related_name="+")
+    fixture = models.ForeignKey("games.Fixture", on_delete=models.CASCADE, related_name="+")
+    at = models.DateTimeField(help_text="When the fixture ended.")
+    score = models.IntegerField(help_text="The user's score after the fixture.")
+
+    objects = ScorePointQuerySet.as_manager()
+
+    class Meta:
+        indexes = (
+            # One user's chart.
+            models.Index(fields=["user", "at"], include=["score"], name="score_point_user"),
+            # Everyone's chart, over a range of time.
+            models.Index(fields=["at"], include=["user", "score"], name="score_point_at"),
+        )
+
+    def __str__(self) -> str:
+        return f"{self.user_id} at {self.at}: {self.score}"
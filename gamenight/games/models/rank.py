@@ -27,6 +27,7 @@ class Rank(models.Model):
 
     class Meta:
         constraints = (models.UniqueConstraint(fields=["user", "fixture"], name="unique_rank"),)
+        indexes = (models.Index(fields=["fixture", "rank"], name="rank_fixture_rank"),)
         ordering = ("rank",)
 
     def __str__(self) -> str:
@@ -0,0 +1,91 @@
+from collections.abc import Iterable
+from typing import TYPE_CHECKING
+
+from django.db import models
+
+from gamenight.games.models.rank import Rank
+
+if TYPE_CHECKING:
+    from gamenight.games.models.game import Game
+
+
+class UserGameStats(models.Model):
+    """A player's record in a game, rolled up from the fixtures applied to their score."""
+
+    user = models.ForeignKey("games.User", on_delete=models.CASCADE, related_name="game_stats")
+    game = models.ForeignKey("games.Game", on_delete=models.CASCADE, related_name="+")
+    played = models.PositiveIntegerField(default=0, help_text="How many fixtures were played.")
+    wins = models.PositiveIntegerField(default=0, help_text="How many fixtures were won.")
+    total_delta = models.IntegerField(default=0, help_text="The net change in score.")
+    best_delta = models.IntegerField(default=0, help_text="The largest change in score.")
+    worst_delta = models.IntegerField(default=0, help_text="The smallest change in score.")
+
+    class Meta:
+        constraints = (
+            models.UniqueConstraint(fields=["user", "game"], name="unique_user_game_stats"),
+        )
+        verbose_name_plural = "user game stats"
+
+    def __str__(self) -> str:
+        return f"{self.user_id} in {self.game_id}: {self.wins}/{self.played}"
+
+    @property
+    def win_rate(self) -> float:
+        return self.wins / self.played if self.played else 0.0
+
+    @staticmethod
+    def record(game: "Game", results: Iterable[tuple[int, int, int]]) -> None:
+        """Add the results of a fixture, as (user ID, rank, delta), to the players' stats.
+
+        The caller must hold a lock on the players, as Fixture.finish does, so concurrent
+        fixtures cannot lose each other's updates.
+        """
+        results = list(results)
+        existing = {
+            stats.user_id: stats
+            for stats in UserGameStats.objects.filter(
+                game=game,
+                user_id__in=[r[0] for r in results],
+            )
+        }
+        created = []
+        for user_id, rank, delta in results:
+            if (stats := existing.get(user_id)) is None:
+                stats = UserGameStats(
+                    user_id=user_id,
+                    game=game,
+                    best_delta=delta,
+                    worst_delta=delta,
+                )
+                created.append(stats)
+            stats.played += 1
+            stats.wins += rank == 1
+            stats.total_delta += delta
+            stats.best_delta = max(stats.best_delta, delta)
+            stats.worst_delta = min(stats.worst_delta, delta)
+        UserGameStats.objects.bulk_update(
+            existing.values(),
+            ["played", "wins", "total_delta", "best_delta", "worst_delta"],
+        )
+        UserGameStats.objects.bulk_create(created)
+
+    @staticmethod
+    def rebuild() -> None:
+        """Rebuild every player's stats from the ranks of the applied fixtures."""
+        rows = (
+            Rank.objects.filter(fixture__applied=True)
+            .values("user_id", "fixture__game_id")
+            .annotate(
+                played=models.Count("pk"),
+                wins=models.Count("pk", filter=models.Q(rank=1)),
+                total_delta=models.Sum("delta"),
+                best_delta=models.Max("delta"),
+                worst_delta=models.Min("delta"),
+            )
+            .order_by()
+        )
+        UserGameStats.objects.all().delete()
+        UserGameStats.objects.bulk_create(
+            UserGameStats(user_id=row.pop("user_id"), game_id=row.pop("fixture__game_id"), **row)
+            for row in rows
+        )
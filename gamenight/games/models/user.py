@@ -1,21 +1,24 @@
+import asyncio
 import base64
-import io
+import contextlib
+import hashlib
 import logging
 from typing import TYPE_CHECKING
 
-import qrcode
-from asgiref import sync
+from asgiref import local, sync
 from cryptography import fernet
 from django import urls
 from django.conf import settings
 from django.contrib.auth.models import AbstractUser, UserManager
-from django.db import models
+from django.core.cache import cache
+from django.db import models, transaction
 
-from gamenight.games import broadcaster
+from gamenight.games import broadcaster, leaderboard, qrcodes
 
 if TYPE_CHECKING:
+    from collections.abc import Iterable, Iterator
+
     from django.db.models.query import QuerySet
-    from qrcode.image.pil import PilImage
 
     from gamenight.games.models.fixture import Fixture
 
@@ -24,9 +27,7 @@ class AvailableManager(models.Manager):
     def get_queryset(self) -> models.QuerySet:
         queryset = super().get_queryset()
         # Exclude users that are in a fixture that has not ended.
-        return queryset.exclude(
-            models.Q(fixture__isnull=False) & models.Q(fixture__ended__isnull=True),
-        )
+        return queryset.filter(active_fixture__isnull=True)
 
 
 class User(AbstractUser):
@@ -36,18 +37,67 @@ class User(AbstractUser):
 
     score = models.PositiveIntegerField(default=DEFAULT_SCORE)
     qrcode = models.URLField(null=False, blank=True, default="", max_length=600)
+    active_fixture = models.ForeignKey(
+        "games.Fixture",
+        null=True,
+        blank=True,
+        editable=False,
+        on_delete=models.SET_NULL,
+        related_name="+",
+        help_text="The fixture the user is playing, if it has not ended.",
+    )
 
     objects = UserManager()  # type: ignore[misc,assignment]
     available: "models.QuerySet[User]" = AvailableManager()  # type: ignore[assignment]
 
     fixture_set: "QuerySet[Fixture]"
+    # The score last read from or written to the database, if known.
+    _saved_score: int | None = None
 
     class Meta:
         ordering = ("username",)
+        indexes = (
+            models.Index(fields=["-score", "username"], name="user_leaderboard"),
+            models.Index(
+                fields=["username"],
+                condition=models.Q(active_fixture__isnull=True),
+                name="user_available",
+            ),
+        )
+
+    @classmethod
+    def from_db(cls, *args, **kwargs) -> "User":
+        user = super().from_db(*args, **kwargs)
+        if "score" in user.__dict__:
+            user._saved_score = user.score  # noqa: SLF001
+        return user
+
+    def refresh_from_db(
+        self,
+        using: str | None = None,
+        fields: "Iterable[str] | None" = None,
+        from_queryset: "models.QuerySet[User] | None" = None,
+    ) -> None:
+        fields = None if fields is None else list(fields)
+        super().refresh_from_db(using=using, fields=fields, from_queryset=from_queryset)
+        if fields is None or "score" in fields:
+            self._saved_score = self.score
 
     def save(self, *args, **kwargs) -> None:
+        """Save the user, broadcasting their score only if it changed.
+
+        Most saves, such as the one recording each login, leave the score alone, and broadcasting
+        them would expire the leaderboard for every client.
+        """
+        update_fields = kwargs.get("update_fields")
+        changed = self._state.adding or (
+            (update_fields is None or "score" in update_fields) and self.score != self._saved_score
+        )
         super().save(*args, **kwargs)
-        self.broadcast_score()
+        if update_fields is None or "score" in update_fields:
+            self._saved_score = self.score
+        if changed:
+            self.broadcast_score()
 
     def set_password(self, raw_password: str | None) -> None:
         super().set_password(raw_password)
@@ -55,26 +105,37 @@ class User(AbstractUser):
         self.set_qrcode(raw_password)
 
     def broadcast_score(self) -> None:
-        try:
-            sync.async_to_sync(UserBroadcaster().send_score)(self.username, self.score)
-        except Exception:
-            logging.exception("Failed to broadcast user score: %s %s", self.username, self.score)
+        score_broadcasts.add(self.username)
 
     def set_qrcode(self, password: str) -> None:
         """Set the QR code for the user."""
+        if self.qrcode:
+            cache.delete(QRCODE_KEY.format(digest=self.get_qrcode_digest()))
         password = fernet.Fernet(settings.FERNET_KEY).encrypt(password.encode()).decode()
         self.qrcode = urls.reverse(
             "users:qr",
             kwargs={"username": self.username, "encrypted_password": password},
         )
 
+    def get_qrcode_url(self) -> str:
+        """Get the URL in the QR code, which logs the user in."""
+        return f"{settings.SCHEMA}://{settings.HOST}{self.qrcode}"
+
+    def get_qrcode_digest(self) -> str:
+        """Get a digest of the URL in the QR code, which changes whenever the code does."""
+        return hashlib.sha256(self.get_qrcode_url().encode()).hexdigest()
+
+    def get_qrcode_png(self) -> bytes:
+        """Get the QR code for the user as a PNG, rendering it only if it is not cached."""
+        key = QRCODE_KEY.format(digest=self.get_qrcode_digest())
+        if (png := cache.get(key)) is None:
+            png = qrcodes.render(self.get_qrcode_url())
+            cache.set(key, png, timeout=QRCODE_TIMEOUT)
+        return png
+
     def get_qrcode(self) -> str:
         """Get the QR code for the user and return as a b64 string."""
-        url = f"{settings.SCHEMA}://{settings.HOST}{self.qrcode}"
-        img: PilImage = qrcode.make(url)
-        buffer = io.BytesIO()
-        img.save(buffer, format="PNG")
-        return base64.b64encode(buffer.getvalue()).decode()
+        return base64.b64encode(self.get_qrcode_png()).decode()
 
 
 class UserBroadcaster(broadcaster.BaseBroadcaster):
@@ -83,3 +144,104 @@ class UserBroadcaster(broadcaster.BaseBroadcaster):
             username[:99],
             {"type": "user.score", "score": score},
         )
+
+    async def send_scores(self, scores: dict[str, int]) -> None:
+        await asyncio.gather(
+            *(self.send_score(username, score) for username, score in scores.items()),
+        )
+
+    async def send_leaderboard(self, scores: dict[str, int]) -> None:
+        await self.layer.group_send(
+            LEADERBOARD_GROUP,
+            {"type": "leaderboard.changed", "scores": scores},
+        )
+
+    async def send_summary(self, scores: dict[str, int]) -> None:
+        await self.layer.group_send(
+            SUMMARY_GROUP,
+            {"type": "leaderboard.changed", "scores": scores},
+        )
+
+
+LEADERBOARD_GROUP = "gamenight.leaderboard"
+# Every score socket, for the summaries of bulk changes.
+SUMMARY_GROUP = "gamenight.summary"
+# Rendered QR codes, keyed by a digest of the URL they encode.
+QRCODE_KEY = "qrcode:{digest}"
+QRCODE_TIMEOUT = 60 * 60 * 24 * 7
+
+
+class ScoreBroadcastQueue:
+    """Broadcasts score changes once the surrounding transaction commits.
+
+    Changes are coalesced per user, then sent as one batch of per-user messages, together with a
+    single leaderboard message. Scores are read when the batch is sent, so changes that were
+    rolled back are never broadcast.
+
+    Bulk changes are sent as a single summary instead, to every score socket, and each user's
+    sockets pick their own score out of it.
+    """
+
+    def __init__(self) -> None:
+        self._local = local.Local()
+
+    def _state(self) -> local.Local:
+        """Get the queue state for the current thread (or coroutine)."""
+        if not hasattr(self._local, "pending"):
+            self._local.pending = set()
+            self._local.summary = set()
+            self._local.suppressed = 0
+        return self._local
+
+    def add(self, *usernames: str) -> None:
+        """Queue the scores of the given users to be broadcast."""
+        state = self._state()
+        if state.suppressed:
+            state.summary.update(usernames)
+            return
+        state.pending.update(usernames)
+        transaction.on_commit(self.flush)
+
+    def flush(self) -> None:
+        """Broadcast every queued score."""
+        state = self._state()
+        pending, state.pending = state.pending, set()
+        if pending:
+            self._send(pending)
+
+    @contextlib.contextmanager
+    def suppressed(self) -> "Iterator[None]":
+        """Hold back broadcasts, sending every change in the block as one summary at the end."""
+        state = self._state()
+        state.suppressed += 1
+        try:
+            yield
+        finally:
+            state.suppressed -= 1
+        if not state.suppressed:
+            summary, state.summary = state.summary, set()
+            if summary:
+                transaction.on_commit(lambda: self._send(summary, summary=True))
+
+    def _send(self, usernames: set[str], *, summary: bool = False) -> None:
+        scores = dict(User.objects.filter(username__in=usernames).values_list("username", "score"))
+        leaderboard.update(scores)
+        leaderboard.cache_scores(scores)
+        try:
+            sync.async_to_sync(self._send_async)(scores, summary=summary)
+        except Exception:
+            logging.exception("Failed to broadcast user scores: %s", scores)
+
+    async def _send_async(self, scores: dict[str, int], *, summary: bool) -> None:
+        # Built per batch, so it always uses the current channel layer.
+        broadcaster = UserBroadcaster()
+        if summary:
+            await broadcaster.send_summary(scores)
+            return
+        await asyncio.gather(
+            broadcaster.send_scores(scores),
+            broadcaster.send_leaderboard(scores),
+        )
+
+
+score_broadcasts = ScoreBroadcastQueue()
@@ -1,13 +1,34 @@
-from gamenight.games.models.fixture import Fixture
+import itertools
+import json
+import logging
+import operator
+from typing import TYPE_CHECKING, cast
+
+from django.db import connection, models, transaction
+
+from gamenight.games import api, elo, recommend
+from gamenight.games.models.checkpoint import ScoreCheckpoint
+from gamenight.games.models.fixture import Fixture, player_graph
 from gamenight.games.models.game import Game
-from gamenight.games.models.user import User
+from gamenight.games.models.history import ScorePoint
+from gamenight.games.models.rank import Rank
+from gamenight.games.models.stats import UserGameStats
+from gamenight.games.models.user import User, score_broadcasts
+
+if TYPE_CHECKING:
+    import uuid
+
+# How many fixtures are replayed between score checkpoints.
+CHECKPOINT_INTERVAL = 100
+# How many ranks are fetched per round trip from the server-side cursor.
+REPLAY_CHUNK_SIZE = 2000
 
 
 def play(game: Game, players: list[User]) -> Fixture:
     """Start a game between players."""
     if not players or len(players) < game.minimum_players:
         raise ValueError("At least two players are required.")
-    if Fixture.objects.filter(users__in=players, ended=None).exists():
+    if User.objects.filter(pk__in=[p.pk for p in players], active_fixture__isnull=False).exists():
         raise ValueError("At least one player is already playing a game.")
     fixture = Fixture.objects.create(game=game)
     fixture.users.set(players)
@@ -16,8 +37,161 @@ def play(game: Game, players: list[User]) -> Fixture:
 
 def recompute_all_scores() -> None:
     """Recompute scores for all users."""
-    for user in User.objects.all():
-        user.score = User.DEFAULT_SCORE
-        user.save()
-    for fixture in Fixture.objects.filter(ended__isnull=False).order_by("ended"):
-        fixture.reapply()
+    replay_scores()
+
+
+@transaction.atomic
+# Scores are written in bulk, so they are broadcast as one summary, which refreshes the
+# leaderboard too.
+@score_broadcasts.suppressed()
+def replay_scores(since: Fixture | None = None) -> None:
+    """Replay ended fixtures in order, recomputing every score, rank delta, graph and stat.
+
+    The score history of the replayed fixtures is rewritten too.
+
+    If `since` is given, replaying starts from the nearest checkpoint before it rather than
+    from scratch, so a correction to a fixture only replays the fixtures after that checkpoint.
+    """
+    checkpoints = ScoreCheckpoint.objects.all()
+    points = ScorePoint.objects.all()
+    checkpoint = None
+    if since is not None and since.ended is not None:
+        checkpoint = (
+            checkpoints.filter(
+                models.Q(ended__lt=since.ended)
+                | models.Q(ended=since.ended, fixture_id__lt=since.pk),
+            )
+            .order_by("-ended", "-fixture")
+            .first()
+        )
+    # Lock every user, in the same order Fixture.finish does, so a fixture finishing mid-replay
+    # waits for the replay rather than having its increments overwritten.
+    users = User.objects.select_for_update(no_key=True).order_by("pk")
+    current = {
+        pk: (username, score)
+        for pk, username, score in users.values_list("pk", "username", "score")
+    }
+    scores = dict.fromkeys(current, User.DEFAULT_SCORE)
+    ranks = Rank.objects.filter(fixture__ended__isnull=False)
+    if checkpoint is not None:
+        logging.info("Replaying scores from checkpoint: %s", checkpoint)
+        scores.update(
+            {int(pk): score for pk, score in checkpoint.scores.items() if int(pk) in scores},
+        )
+        after = models.Q(ended__gt=checkpoint.ended) | models.Q(
+            ended=checkpoint.ended,
+            fixture_id__gt=checkpoint.fixture_id,
+        )
+        checkpoints = checkpoints.filter(after)
+        points = points.filter(
+            models.Q(at__gt=checkpoint.ended)
+            | models.Q(at=checkpoint.ended, fixture_id__gt=checkpoint.fixture_id),
+        )
+        ranks = ranks.filter(
+            models.Q(fixture__ended__gt=checkpoint.ended)
+            | models.Q(fixture__ended=checkpoint.ended, fixture_id__gt=checkpoint.fixture_id),
+        )
+    checkpoints.delete()
+    points.delete()
+
+    games = {game.pk: game for game in Game.objects.all()}
+    rows = (
+        ranks.order_by("fixture__ended", "fixture_id", "pk")
+        .values_list(
+            "fixture_id",
+            "fixture__ended",
+            "fixture__game_id",
+            "pk",
+            "user_id",
+            "rank",
+            "team",
+        )
+        .iterator(chunk_size=REPLAY_CHUNK_SIZE)
+    )
+    updated_ranks: list[tuple[int, int]] = []
+    updated_fixtures: list[tuple[uuid.UUID, bool, str]] = []
+    new_checkpoints: list[ScoreCheckpoint] = []
+    new_points: list[ScorePoint] = []
+    for count, ((fixture_id, ended, game_id), group) in enumerate(
+        itertools.groupby(rows, key=operator.itemgetter(0, 1, 2)),
+        start=1,
+    ):
+        fixture_ranks = [row[3:] for row in group]
+        if len(fixture_ranks) < 2 or not all(rank for _, _, rank, _ in fixture_ranks):  # noqa: PLR2004
+            logging.warning("Skipping fixture with unranked players: %s", fixture_id)
+            continue
+        # Order players the same way Fixture._build_player_graph does.
+        fixture_ranks.sort(key=lambda r: (r[2], scores[r[1]], r[0]))
+        pks, user_ids, rank_numbers, teams = zip(*fixture_ranks, strict=True)
+        game = games[game_id]
+        deltas = elo.pairwise_deltas(
+            rank_numbers,
+            [scores[user_id] for user_id in user_ids],
+            teams,
+            importance=game.importance,
+            randomness=game.randomness,
+        )
+        changes = deltas.sum(axis=0) - deltas.sum(axis=1)
+        for pk, user_id, change in zip(pks, user_ids, changes.tolist(), strict=True):
+            scores[user_id] += change
+            updated_ranks.append((pk, change))
+            new_points.append(
+                ScorePoint(user_id=user_id, fixture_id=fixture_id, at=ended, score=scores[user_id]),
+            )
+        graph = player_graph(pks, deltas)
+        edges = [
+            {"source": source, "target": target, "delta": data["delta"]}
+            for source, target, data in graph.edges(data=True)
+        ]
+        updated_fixtures.append((fixture_id, True, json.dumps(edges)))
+        if count % CHECKPOINT_INTERVAL == 0:
+            new_checkpoints.append(
+                ScoreCheckpoint(
+                    fixture_id=fixture_id,
+                    ended=ended,
+                    scores={str(pk): score for pk, score in scores.items()},
+                ),
+            )
+
+    _bulk_set(Rank, ["delta"], updated_ranks)
+    _bulk_set(Fixture, ["applied", "graph"], updated_fixtures)
+    changed = [(pk, score) for pk, score in scores.items() if current[pk][1] != score]
+    _bulk_set(User, ["score"], changed)
+    ScoreCheckpoint.objects.bulk_create(new_checkpoints)
+    ScorePoint.objects.bulk_create(new_points, batch_size=REPLAY_CHUNK_SIZE)
+    UserGameStats.rebuild()
+    _replayed([current[pk][0] for pk, _ in changed])
+
+
+def _replayed(usernames: list[str]) -> None:
+    """Queue the changed scores for the summary, and expire the API and the recommender."""
+    score_broadcasts.add(*usernames)
+    api.fixtures_changed()
+    recommend.history_rewritten()
+
+
+def _bulk_set(model: type[models.Model], field_names: list[str], rows: list[tuple]) -> None:
+    """Set fields on many rows, given as (pk, *values), in one pipelined statement.
+
+    QuerySet.bulk_update builds a CASE expression per field, which is far too slow for the tens
+    of thousands of rows rewritten by a replay.
+    """
+    if not rows:
+        return
+    opts = model._meta  # noqa: SLF001
+    fields = [cast(models.Field, opts.get_field(name)) for name in field_names]
+    quote = connection.ops.quote_name
+    assignments = ", ".join(f"{quote(field.column)} = %s" for field in fields)
+    sql = f"UPDATE {quote(opts.db_table)} SET {assignments} WHERE {quote(opts.pk.column)} = %s"  # noqa: S608
+    with connection.cursor() as cursor:
+        cursor.executemany(
+            sql,
+            [
+                [
+                    field.get_db_prep_save(value, connection)
+                    for field, value in zip(fields, values, strict=True)
+                ]
+                + [pk]
+                for pk, *values in rows
+            ],
+        )
@@ -0,0 +1,181 @@
+"""Keyset (cursor) pagination for iommi tables.
+
+Rather than counting the rows and skipping to an OFFSET, each page starts after the last row of
+the page before, so deep pages cost the same as the first. Pages are loaded as the user scrolls,
+with htmx fetching the rows of the next page from the table's rows endpoint.
+
+Enable it on a table with a key: the fields the rows are ordered by, ending in a unique one.
+
+    class Meta:
+        parts__page__call_target = pagination.KeysetPaginator
+        parts__page__key = ("-started", "-id")
+        endpoints__rows__func = pagination.rows_endpoint
+        sortable = False
+"""
+
+import base64
+import binascii
+import bisect
+import functools
+import json
+from collections.abc import Sequence
+from typing import Any
+
+from django import http
+from django.core import exceptions
+from django.db.models import Q, QuerySet
+from django.template import loader
+from django.utils import safestring
+from iommi import table as iommi_table
+from iommi.refinable import Refinable
+
+
+@functools.total_ordering
+class _Descending:
+    """Invert the ordering of a value, for bisecting on descending keys."""
+
+    def __init__(self, value: Any) -> None:  # noqa: ANN401
+        self.value = value
+
+    def __eq__(self, other: object) -> bool:
+        return isinstance(other, _Descending) and self.value == other.value
+
+    def __lt__(self, other: "_Descending") -> bool:
+        return self.value > other.value
+
+    def __hash__(self) -> int:
+        return hash(self.value)
+
+
+def _fields(key: Sequence[str]) -> list[tuple[str, bool]]:
+    """Split a key into (field, descending) pairs."""
+    return [(field.removeprefix("-"), field.startswith("-")) for field in key]
+
+
+def encode_cursor(key: Sequence[str], row: Any) -> str:  # noqa: ANN401
+    """Encode the position of a row as an opaque cursor."""
+    values = [getattr(row, field) for field, _ in _fields(key)]
+    # Not DjangoJSONEncoder, which truncates datetimes to milliseconds.
+    return base64.urlsafe_b64encode(json.dumps(values, default=str).encode()).decode()
+
+
+def decode_cursor(cursor: str) -> list[Any] | None:
+    """Decode a cursor, or return None if it is invalid."""
+    try:
+        values = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+    except (binascii.Error, UnicodeDecodeError, ValueError):
+        return None
+    return values if isinstance(values, list) else None
+
+
+def coerce_cursor(
+    rows: QuerySet | Sequence,
+    key: Sequence[str],
+    values: list[Any],
+) -> list[Any] | None:
+    """Convert cursor values to the types of the key's fields, or return None if any is invalid.
+
+    Cursors come from the query string, so anything can be in them. Querysets convert each value
+    with its model field, while sequences only accept values of the same type as their rows'.
+    """
+    fields = _fields(key)
+    if len(values) != len(fields) or any(value is None for value in values):
+        return None
+    if not isinstance(rows, QuerySet):
+        if rows and not all(
+            type(value) is type(getattr(rows[0], field))
+            for (field, _), value in zip(fields, values, strict=True)
+        ):
+            return None
+        return values
+    try:
+        return [
+            rows.model._meta.get_field(field).to_python(value)  # noqa: SLF001
+            for (field, _), value in zip(fields, values, strict=True)
+        ]
+    except (exceptions.ValidationError, TypeError, ValueError):
+        return None
+
+
+def after(rows: QuerySet | Sequence, key: Sequence[str], values: list[Any]) -> QuerySet | Sequence:
+    """Get the rows after the cursor values, in the order of the key.
+
+    Querysets are filtered (so an index on the key serves any page), while sequences must
+    already be sorted by the key, and are bisected.
+    """
+    fields = _fields(key)
+    if isinstance(rows, QuerySet):
+        condition = Q()
+        for i, (field, descending) in enumerate(fields):
+            lookup = f"{field}__lt" if descending else f"{field}__gt"
+            equal = {f: v for (f, _), v in zip(fields[:i], values, strict=False)}
+            condition |= Q(**equal, **{lookup: values[i]})
+        return rows.filter(condition).order_by(*key)
+
+    def sort_key(row: Any) -> tuple:  # noqa: ANN401
+        return tuple(
+            _Descending(getattr(row, field)) if descending else getattr(row, field)
+            for field, descending in fields
+        )
+
+    target = tuple(
+        _Descending(value) if descending else value
+        for (_, descending), value in zip(fields, values, strict=True)
+    )
+    return rows[bisect.bisect_right(rows, target, key=sort_key) :]
+
+
+class KeysetPaginator(iommi_table.Paginator):
+    """A paginator which pages by cursor rather than by page number, and never counts rows."""
+
+    key: Sequence[str] = Refinable()
+
+    class Meta:
+        template = "chunk/keyset_paginator.html"
+
+    def on_bind(self) -> None:
+        request = self.get_request()
+        table = self.iommi_evaluate_parameters()["table"]
+        self.page_size = table.page_size
+        self.cursor_parameter = f"{self.iommi_path}_after"
+        rows = table.sorted_and_filtered_rows
+        if isinstance(rows, QuerySet):
+            rows = rows.order_by(*self.key)
+        cursor = request.GET.get(self.cursor_parameter) if request else None
+        if (
+            cursor
+            and (values := decode_cursor(cursor)) is not None
+            and (values := coerce_cursor(rows, self.key, values)) is not None
+        ):
+            rows = after(rows, self.key, values)
+        # Fetch one row more than fits the page, to know whether there is a next page.
+        rows = list(rows[: self.page_size + 1])
+        self.rows = rows[: self.page_size]
+        self.count = len(self.rows)
+        self.number_of_pages = 1
+        self.page = 1
+        next_cursor = encode_cursor(self.key, self.rows[-1]) if len(rows) > self.page_size else None
+
+        get = request.GET.copy() if request else http.QueryDict(mutable=True)
+        for parameter in [self.cursor_parameter, *(k for k in get if k.startswith("/"))]:
+            get.pop(parameter, None)
+        extra = get.urlencode() + "&" if get else ""
+        self.context = {
+            **self.iommi_evaluate_parameters(),
+            "paginator": self,
+            "element_id": f"{table.iommi_path or 'table'}-paginator",
+            "next_url": next_cursor and f"?{extra}{self.cursor_parameter}={next_cursor}",
+            "rows_endpoint": table.endpoints.rows.iommi_path,
+        }
+
+    def is_paginated(self) -> bool:
+        return self.context["next_url"] is not None
+
+    def __html__(self) -> str:
+        return loader.render_to_string(self.template, self.context, request=self.get_request())
+
+
+def rows_endpoint(table: iommi_table.Table, **_) -> http.HttpResponse:
+    """Render the rows of a page, and swap in the paginator for the page after."""
+    rows = "\n".join(cells.__html__() for cells in table.cells_for_rows())
+    return http.HttpResponse(safestring.mark_safe(rows + table.paginator.__html__()))  # noqa: S308
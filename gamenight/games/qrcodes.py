@@ -0,0 +1,85 @@
+"""Render QR codes to PNGs, and lay them out on printable sheets.
+
+Nothing here touches the database, so codes can be rendered across a process pool.
+"""
+
+import concurrent.futures
+import io
+import os
+import pathlib
+import tempfile
+import zipfile
+from collections.abc import Sequence
+
+import qrcode
+from PIL import Image, ImageDraw
+
+# A4 at 150 DPI, with a grid of codes and their usernames.
+SHEET_SIZE = (1240, 1754)
+SHEET_COLUMNS = 3
+SHEET_ROWS = 4
+SHEET_MARGIN = 60
+LABEL_HEIGHT = 40
+
+
+def render(url: str) -> bytes:
+    """Render a QR code of a URL as a PNG."""
+    buffer = io.BytesIO()
+    qrcode.make(url).save(buffer, format="PNG")
+    return buffer.getvalue()
+
+
+def render_all(urls: Sequence[str], workers: int | None = None) -> list[bytes]:
+    """Render many QR codes in parallel.
+
+    By default, there is one worker per CPU. Use workers=1 to render in this process.
+    """
+    workers = workers or os.cpu_count() or 1
+    if workers == 1 or len(urls) < 2:  # noqa: PLR2004
+        return list(map(render, urls))
+    with concurrent.futures.ProcessPoolExecutor(workers) as pool:
+        return list(pool.map(render, urls, chunksize=max(1, len(urls) // (4 * workers))))
+
+
+def write_atomic(path: pathlib.Path, data: bytes) -> None:
+    """Write a file so readers only ever see the old or the new contents, never a partial one."""
+    with tempfile.NamedTemporaryFile(dir=path.parent, prefix=f".{path.name}.", delete=False) as f:
+        f.write(data)
+    pathlib.Path(f.name).replace(path)
+
+
+def sheets(codes: Sequence[tuple[str, bytes]]) -> list[Image.Image]:
+    """Lay out (username, PNG) pairs on printable pages, labelled with the usernames."""
+    cell_width = (SHEET_SIZE[0] - 2 * SHEET_MARGIN) // SHEET_COLUMNS
+    cell_height = (SHEET_SIZE[1] - 2 * SHEET_MARGIN) // SHEET_ROWS
+    size = min(cell_width, cell_height - LABEL_HEIGHT)
+    per_page = SHEET_COLUMNS * SHEET_ROWS
+    pages = []
+    for start in range(0, len(codes), per_page):
+        page = Image.new("RGB", SHEET_SIZE, "white")
+        draw = ImageDraw.Draw(page)
+        for i, (username, png) in enumerate(codes[start : start + per_page]):
+            row, column = divmod(i, SHEET_COLUMNS)
+            x = SHEET_MARGIN + column * cell_width + (cell_width - size) // 2
+            y = SHEET_MARGIN + row * cell_height
+            with Image.open(io.BytesIO(png)) as code:
+                page.paste(code.convert("RGB").resize((size, size)), (x, y))
+            draw.text((x + size // 2, y + size + LABEL_HEIGHT // 2), username, "black", anchor="mm")
+        pages.append(page)
+    return pages
+
+
+def write_sheet(path: pathlib.Path, codes: Sequence[tuple[str, bytes]]) -> None:
+    """Write the codes as one printable PDF, or as a ZIP of PNGs, depending on the suffix."""
+    buffer = io.BytesIO()
+    if path.suffix == ".zip":
+        with zipfile.ZipFile(buffer, "w") as archive:
+            for username, png in codes:
+                archive.writestr(f"{username}.png", png)
+    elif path.suffix == ".pdf":
+        first, *rest = sheets(codes) or [Image.new("RGB", SHEET_SIZE, "white")]
+        first.save(buffer, format="PDF", save_all=True, append_images=rest)
+    else:
+        msg = f"Unsupported sheet format: {path.suffix}"
+        raise ValueError(msg)
+    write_atomic(path, buffer.getvalue())
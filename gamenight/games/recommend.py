@@ -0,0 +1,209 @@
+"""Recommend games for a group of players, from the fixtures they have played.
+
+Each process keeps a matrix of every player's net score change, and the last time they played,
+in every game. A candidate game is scored on three things: how evenly matched the players are
+at it, how long it has been since they played it, and how short it is.
+
+The matrices are built on the first recommendation, then topped up with only the fixtures
+applied since, whenever the version in the cache moves on (see signals.py). Replays rewrite
+history, so they force a full rebuild instead.
+"""
+
+import dataclasses
+import datetime
+import threading
+import uuid
+from collections.abc import Iterable, Sequence
+from typing import cast
+
+import numpy as np
+import numpy.typing as npt
+from django.db import models as db_models
+from django.db import transaction
+from django.utils import timezone
+
+from gamenight.games import leaderboard, models, versions
+
+VERSION_KEY = "recommend:version"
+EPOCH_KEY = "recommend:epoch"
+# How much each score counts towards a recommendation: evenly matched, not played lately, short.
+WEIGHTS = (0.5, 0.3, 0.2)
+# The spread of ratings at which players count as half as evenly matched.
+EVEN_SCALE = 100.0
+# How long until a game played by the group counts as half as fresh again.
+RECENCY_HALF_LIFE = datetime.timedelta(hours=2)
+# The duration, in minutes, at which a game counts as half as short.
+SHORT_SCALE = 30.0
+# Fixtures can commit out of the order they ended in, so refreshes look back this far.
+REFRESH_SLACK = datetime.timedelta(minutes=10)
+
+
+@dataclasses.dataclass
+class History:
+    """Every player's net score change, and when they last played, in every game."""
+
+    users: dict[str, int]
+    games: dict[uuid.UUID, int]
+    delta: npt.NDArray[np.int64]
+    last_played: npt.NDArray[np.float64]
+    # When every fixture added so far ended.
+    seen: dict[uuid.UUID, datetime.datetime]
+    watermark: datetime.datetime | None
+    version: int
+    epoch: int
+
+    @staticmethod
+    def build(version: int, epoch: int) -> "History":
+        """Build the history from every applied fixture, in one query."""
+        history = History(
+            users={},
+            games={},
+            delta=np.zeros((0, 0), dtype=np.int64),
+            last_played=np.full((0, 0), -np.inf),
+            seen={},
+            watermark=None,
+            version=version,
+            epoch=epoch,
+        )
+        history.add(models.Rank.objects.filter(fixture__applied=True))
+        return history
+
+    def refresh(self, version: int) -> None:
+        """Add the fixtures applied since the last refresh."""
+        ranks = models.Rank.objects.filter(fixture__applied=True)
+        if self.watermark is not None:
+            since = self.watermark - REFRESH_SLACK
+            ranks = ranks.filter(fixture__ended__gte=since).exclude(
+                fixture_id__in=[pk for pk, ended in self.seen.items() if ended >= since],
+            )
+        self.add(ranks)
+        self.version = version
+
+    def add(self, ranks: "db_models.QuerySet[models.Rank]") -> None:
+        """Add the ranks of applied fixtures."""
+        # Applied fixtures have always ended.
+        rows = cast(
+            "list[tuple[uuid.UUID, datetime.datetime, uuid.UUID, str, int]]",
+            list(
+                ranks.values_list(
+                    "fixture_id",
+                    "fixture__ended",
+                    "fixture__game_id",
+                    "user__username",
+                    "delta",
+                ),
+            ),
+        )
+        self._grow([row[3] for row in rows], [row[2] for row in rows])
+        for fixture_id, ended, game_id, username, delta in rows:
+            row, column = self.users[username], self.games[game_id]
+            self.delta[row, column] += delta
+            self.last_played[row, column] = max(self.last_played[row, column], ended.timestamp())
+            self.seen[fixture_id] = ended
+            self.watermark = max(self.watermark or ended, ended)
+
+    def _grow(self, usernames: Iterable[str], game_ids: Iterable[uuid.UUID]) -> None:
+        """Add a row for every new player, and a column for every new game."""
+        for username in usernames:
+            self.users.setdefault(username, len(self.users))
+        for game_id in game_ids:
+            self.games.setdefault(game_id, len(self.games))
+        shape = (len(self.users), len(self.games))
+        if shape != self.delta.shape:
+            rows, columns = self.delta.shape
+            delta = np.zeros(shape, dtype=np.int64)
+            delta[:rows, :columns] = self.delta
+            last_played = np.full(shape, -np.inf)
+            last_played[:rows, :columns] = self.last_played
+            self.delta, self.last_played = delta, last_played
+
+    def scores(
+        self,
+        usernames: Sequence[str],
+        games: Sequence[models.Game],
+        ratings: npt.NDArray[np.float64],
+        now: float,
+    ) -> npt.NDArray[np.float64]:
+        """Score the games for the players, whose overall ratings are given, between 0 and 1."""
+        rows = [self.users.get(username, -1) for username in usernames]
+        columns = [self.games.get(game.pk, -1) for game in games]
+        # Players and games without history get an empty row or column.
+        delta = np.zeros((len(rows), len(columns)))
+        last_played = np.full((len(rows), len(columns)), -np.inf)
+        known_rows = np.array([row >= 0 for row in rows], dtype=bool)
+        known_columns = np.array([column >= 0 for column in columns], dtype=bool)
+        if known_rows.any() and known_columns.any():
+            index = np.ix_(
+                np.array(rows)[known_rows],
+                np.array(columns)[known_columns],
+            )
+            known = np.ix_(known_rows, known_columns)
+            delta[known] = self.delta[index]
+            last_played[known] = self.last_played[index]
+
+        even = np.exp2(-(ratings[:, None] + delta).std(axis=0) / EVEN_SCALE)
+        ages = (now - last_played) / RECENCY_HALF_LIFE.total_seconds()
+        fresh = 1 - np.exp2(-ages).mean(axis=0)
+        durations = np.array([game.estimated_duration for game in games], dtype=np.float64)
+        short = 1 / (1 + durations / SHORT_SCALE)
+        return np.average(np.stack([even, fresh, short]), axis=0, weights=WEIGHTS)
+
+
+_lock = threading.Lock()
+_history: History | None = None
+
+
+def recommend(usernames: Sequence[str], games: Sequence[models.Game]) -> list[models.Game]:
+    """Order the games the players can play, best first."""
+    if not usernames:
+        return list(games)
+    return [game for game, _ in top(usernames, games, k=len(games))]
+
+
+def top(
+    usernames: Sequence[str],
+    games: Sequence[models.Game],
+    k: int,
+) -> list[tuple[models.Game, float]]:
+    """Get the k best games for the players, with their scores, best first.
+
+    Besides the cached leaderboard, nothing is read from the database unless a fixture was
+    applied since the last call.
+    """
+    if not usernames or not games or k <= 0:
+        return []
+    history = _current()
+    players = set(usernames)
+    scores = {
+        entry.username: entry.score for entry in leaderboard.snapshot() if entry.username in players
+    }
+    ratings = np.array(
+        [scores.get(username, models.User.DEFAULT_SCORE) for username in usernames],
+        dtype=np.float64,
+    )
+    values = history.scores(usernames, games, ratings, timezone.now().timestamp())
+    # Stable, so equally good games stay in the order given.
+    best = np.argsort(-values, kind="stable")[:k]
+    return [(games[i], float(values[i])) for i in best]
+
+
+def fixture_applied() -> None:
+    """Have every process add the newly applied fixtures, once the transaction commits."""
+    transaction.on_commit(lambda: versions.bump(VERSION_KEY))
+
+
+def history_rewritten() -> None:
+    """Have every process rebuild its history, once the transaction commits."""
+    transaction.on_commit(lambda: versions.bump(EPOCH_KEY))
+
+
+def _current() -> History:
+    global _history  # noqa: PLW0603
+    version = versions.get(VERSION_KEY)
+    epoch = versions.get(EPOCH_KEY)
+    with _lock:
+        if _history is None or _history.epoch != epoch:
+            _history = History.build(version, epoch)
+        elif _history.version != version:
+            _history.refresh(version)
+        return _history
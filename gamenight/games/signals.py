@@ -0,0 +1,73 @@
+"""Keep denormalized data in sync with the models it is derived from."""
+
+from django.db import models
+from django.db.models import signals
+from django.dispatch import receiver
+
+from gamenight.games import api, eligibility, recommend
+from gamenight.games.models import Fixture, Game, Rank, User
+
+
+def sync_active_fixtures(users: "models.QuerySet[User]") -> None:
+    """Point each user at the latest fixture they are playing that has not ended, if any."""
+    active = Rank.objects.filter(user=models.OuterRef("pk"), fixture__ended__isnull=True)
+    users.update(
+        active_fixture=models.Subquery(active.order_by("-fixture__started").values("fixture")[:1]),
+    )
+
+
+@receiver(signals.m2m_changed, sender=Fixture.users.through)
+def fixture_users_changed(
+    instance: Fixture | User,
+    action: str,
+    pk_set: set | None,
+    **_,
+) -> None:
+    """Sync the players added to, or removed from, a fixture."""
+    if action not in {"post_add", "post_remove", "post_clear"}:
+        return
+    if isinstance(instance, User):
+        sync_active_fixtures(User.objects.filter(pk=instance.pk))
+    elif action == "post_clear":
+        sync_active_fixtures(User.objects.filter(active_fixture=instance))
+    else:
+        sync_active_fixtures(User.objects.filter(pk__in=pk_set or ()))
+
+
+@receiver(signals.post_save, sender=Rank)
+@receiver(signals.post_delete, sender=Rank)
+def rank_changed(instance: Rank, **_) -> None:
+    """Sync a player when their rank is created or deleted directly (e.g. in the admin)."""
+    sync_active_fixtures(User.objects.filter(pk=instance.user_id))
+
+
+@receiver(signals.post_save, sender=Fixture)
+def fixture_saved(instance: Fixture, update_fields: "frozenset[str] | None", **_) -> None:
+    """Release the players of a fixture once it ends."""
+    if instance.ended is not None and (update_fields is None or "ended" in update_fields):
+        sync_active_fixtures(User.objects.filter(active_fixture=instance))
+
+
+@receiver(signals.post_save, sender=Fixture)
+def fixture_applied(instance: Fixture, update_fields: "frozenset[str] | None", **_) -> None:
+    """Add a fixture to the recommender's history once its scores are applied."""
+    if instance.applied and (update_fields is None or "applied" in update_fields):
+        recommend.fixture_applied()
+
+
+@receiver(signals.post_save, sender=Fixture)
+@receiver(signals.post_delete, sender=Fixture)
+@receiver(signals.post_save, sender=Rank)
+@receiver(signals.post_delete, sender=Rank)
+@receiver(signals.m2m_changed, sender=Fixture.users.through)
+def fixtures_changed(**_) -> None:
+    """Expire the API's fixtures whenever a fixture, or its players, change."""
+    api.fixtures_changed()
+
+
+@receiver(signals.post_save, sender=Game)
+@receiver(signals.post_delete, sender=Game)
+def games_changed(**_) -> None:
+    """Expire the index of games by number of players, and the API's fixtures (by game name)."""
+    eligibility.games_changed()
+    api.fixtures_changed()
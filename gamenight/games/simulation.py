@@ -0,0 +1,181 @@
+"""Simulate seasons of fixtures in memory, to tune the rating system without the database.
+
+Fixtures are rated with the same ELO engine as Fixture.finish, but scores are kept in NumPy
+arrays, so thousands of seasons run in the time the ORM takes for a handful. Seasons are
+independent, so they are spread over a process pool.
+"""
+
+import concurrent.futures
+import dataclasses
+import itertools
+import os
+from collections.abc import Mapping, Sequence
+from typing import TYPE_CHECKING
+
+import numpy as np
+import numpy.typing as npt
+
+from gamenight.games import elo
+
+if TYPE_CHECKING:
+    from gamenight.games.models import Game
+
+# The score every player starts with, as in User.DEFAULT_SCORE.
+DEFAULT_SCORE = 1000
+# How much a player's performance varies between fixtures of a game of pure skill.
+# A game of pure chance (randomness=1) triples it.
+PERFORMANCE_STDEV = 200
+
+
+@dataclasses.dataclass(frozen=True)
+class GameConfig:
+    """The parameters of a game that matter to the rating system."""
+
+    name: str
+    ranked: bool
+    minimum_players: int
+    maximum_players: int | None
+    importance: int
+    randomness: float
+
+    @classmethod
+    def from_game(cls, game: "Game") -> "GameConfig":
+        return cls(
+            name=game.name,
+            ranked=game.ranked,
+            minimum_players=game.minimum_players,
+            maximum_players=game.maximum_players,
+            importance=game.importance,
+            randomness=game.randomness,
+        )
+
+
+@dataclasses.dataclass(frozen=True)
+class Season:
+    """The shape of a simulated season."""
+
+    players: int = 25
+    rounds: int = 40
+    max_fixture_size: int = 4
+    # The distribution of the players' true scores.
+    mean: float = 1000
+    stdev: float = 500
+
+
+@dataclasses.dataclass(frozen=True)
+class Convergence:
+    """How well the scores of a configuration converged, averaged over many seasons."""
+
+    name: str
+    # The mean error before the season, and after each round.
+    errors: list[float]
+    final_stdev: float
+
+    @property
+    def final(self) -> float:
+        return self.errors[-1]
+
+
+def convergence_error(true_scores: npt.ArrayLike, scores: npt.ArrayLike) -> float:
+    """Measure how far scores are from the true scores, relative to the mean true score."""
+    true_scores = np.asarray(true_scores, dtype=np.float64)
+    errors = np.abs(true_scores - np.asarray(scores, dtype=np.float64))
+    return float(np.std(errors, ddof=1) / np.mean(true_scores))
+
+
+def rank_players(game: GameConfig, performances: npt.ArrayLike) -> npt.NDArray[np.int64]:
+    """Rank players by performance, best first. Win/lose games only rank the winner first."""
+    performances = np.asarray(performances, dtype=np.float64)
+    ranks = np.empty(len(performances), dtype=np.int64)
+    ranks[np.argsort(-performances, kind="stable")] = np.arange(1, len(performances) + 1)
+    if not game.ranked:
+        ranks = np.minimum(ranks, 2)
+    return ranks
+
+
+def rate_fixture(
+    game: GameConfig,
+    ranks: npt.ArrayLike,
+    scores: npt.ArrayLike,
+) -> npt.NDArray[np.int64]:
+    """Compute the change in score of every player in a fixture, as Fixture.finish would."""
+    ranks = np.asarray(ranks)
+    deltas = elo.pairwise_deltas(
+        ranks.tolist(),
+        np.asarray(scores).tolist(),
+        [""] * len(ranks),
+        importance=game.importance,
+        randomness=game.randomness,
+    )
+    return deltas.sum(axis=0) - deltas.sum(axis=1)
+
+
+def simulate_season(games: Sequence[GameConfig], season: Season, seed: int) -> list[float]:
+    """Simulate a season, returning the convergence error before it and after every round.
+
+    In every round, players are dealt into fixtures of the games (in a random order) until too
+    few players are left for any game. Each player performs around their true score.
+    """
+    rng = np.random.default_rng(seed)
+    true_scores = rng.normal(season.mean, season.stdev, season.players).round()
+    scores = np.full(season.players, DEFAULT_SCORE, dtype=np.int64)
+    errors = [convergence_error(true_scores, scores)]
+    for _ in range(season.rounds):
+        players = rng.permutation(season.players)
+        skipped = 0
+        for i in itertools.cycle(rng.permutation(len(games))):
+            game = games[i]
+            if len(players) < game.minimum_players:
+                if (skipped := skipped + 1) == len(games):
+                    break
+                continue
+            skipped = 0
+            size = min(
+                game.maximum_players or len(players),
+                max(season.max_fixture_size, game.minimum_players),
+                len(players),
+            )
+            fixture, players = players[:size], players[size:]
+            stdev = PERFORMANCE_STDEV * (1 + 2 * game.randomness)
+            ranks = rank_players(game, rng.normal(true_scores[fixture], stdev))
+            scores[fixture] += rate_fixture(game, ranks, scores[fixture])
+        errors.append(convergence_error(true_scores, scores))
+    return errors
+
+
+def _simulate_season(args: tuple[Sequence[GameConfig], Season, int]) -> list[float]:
+    return simulate_season(*args)
+
+
+def simulate(
+    configurations: Mapping[str, Sequence[GameConfig]],
+    season: Season,
+    *,
+    seasons: int = 100,
+    seed: int = 0,
+    workers: int | None = None,
+) -> list[Convergence]:
+    """Simulate many seasons of every configuration (a set of games), in parallel.
+
+    Every configuration plays the same seasons (the same seeds), so they can be compared.
+    By default, there is one worker per CPU. Use workers=1 to simulate in this process.
+    """
+    tasks = [(games, season, seed + i) for games in configurations.values() for i in range(seasons)]
+    workers = workers or os.cpu_count() or 1
+    if workers == 1:
+        results = list(map(_simulate_season, tasks))
+    else:
+        with concurrent.futures.ProcessPoolExecutor(workers) as pool:
+            chunksize = max(1, len(tasks) // (4 * workers))
+            results = list(pool.map(_simulate_season, tasks, chunksize=chunksize))
+    convergences = []
+    for i, name in enumerate(configurations):
+        errors = np.array(results[i * seasons : (i + 1) * seasons])
+        convergences.append(
+            Convergence(
+                name=name,
+                errors=errors.mean(axis=0).tolist(),
+                final_stdev=float(errors[:, -1].std()),
+            ),
+        )
+    return convergences
@@ -37,6 +37,16 @@ function updateTeam(username, team_name) {
     inputElement.value = r + '--' + u + '--' + team_name;
 }
 
+// Save one player's rank and team, and swap in the rank groups that changed.
+function moveRank(username) {
+    var [rank, u, team] = document.getElementById('user-' + username).value.split('--');
+    htmx.ajax('POST', document.getElementById('rank-groups').dataset.moveUrl, {
+        swap: 'none',
+        values: {username: username, rank: rank, team: team},
+        headers: {'X-CSRFToken': document.querySelector('[name=csrfmiddlewaretoken]').value},
+    });
+}
+
 htmx.onLoad(function(content) {
     var sortables = content.querySelectorAll(".sortable");
     for (var i = 0; i < sortables.length; i++) {
@@ -58,6 +68,9 @@ htmx.onLoad(function(content) {
                 var inputElement = evt.item.querySelector('input');
                 const regex = /\d+/;
                 inputElement.value = inputElement.value.replace(regex, evt.to.id);
+                if (evt.from !== evt.to) {
+                    moveRank(inputElement.value.split('--')[1]);
+                }
                 evt.item.dispatchEvent(new CustomEvent('sorted', {
                     bubbles: true
                 }));
@@ -1,25 +1,56 @@
 import iommi
 from django import template
-from django.templatetags import static
 
-from gamenight.games import models
+from gamenight.games import leaderboard, models, pagination
 
 # Some helpful column templates.
 timesince = template.Template("<td>{% if value %}{{ value|timesince }} ago{% endif %}</td>")
 
 
 class UserTable(iommi.Table):
+    position = iommi.Column.number(display_name="#", cell__template="chunk/position.html")
     username = iommi.Column()
     score = iommi.Column.number(cell__template="chunk/score.html")
 
     class Meta:
-        assets__leaderboard_css = iommi.Asset.css(
-            attrs__href=static.static("games/leaderboard.css"),
-        )
-        rows = models.User.objects.all().order_by("-score")
+        rows = lambda **_: leaderboard.snapshot()  # noqa: E731
         title = "Leaderboard"
-        page_size = 30
-        attrs = {"_": "on htmx:wsAfterMessage call sortTable()"}
+        page_size = leaderboard.PAGE_SIZE
+        # The snapshot is ordered by score, then username.
+        parts__page__call_target = pagination.KeysetPaginator
+        parts__page__key = ("-score", "username")
+        endpoints__rows__func = pagination.rows_endpoint
+        sortable = False
+        attrs = {
+            "_": "on htmx:wsAfterMessage call sortTable()",
+            # One socket pushes updates for every row on the page, and is told whenever a page
+            # of rows is loaded.
+            "hx-ext": "ws",
+            "ws-connect": "/ws/leaderboard",
+            "ws-send": "",
+            "hx-trigger": "htmx:afterSettle[target.tagName=='TBODY'] from:find tbody",
+            "hx-vals": "js:{rows: document.querySelectorAll('[id$=\"-position\"]').length}",
+        }
+
+
+class UserGameStatsTable(iommi.Table):
+    game = iommi.Column(cell__url=lambda row, **_: row.game.get_absolute_url())
+    played = iommi.Column.number()
+    wins = iommi.Column.number()
+    win_rate = iommi.Column.number(cell__format=lambda value, **_: f"{value:.0%}")
+    total_delta = iommi.Column.number(display_name="Net")
+    best_delta = iommi.Column.number(display_name="Best")
+    worst_delta = iommi.Column.number(display_name="Worst")
+
+    class Meta:
+        rows = lambda request, **_: (  # noqa: E731
+            models.UserGameStats.objects.filter(user=request.user)
+            .select_related("game")
+            .order_by("-played", "game__name")
+        )
+        title = "Your Games"
+        sortable = False
+        page_size = None
 
 
 class GameTable(iommi.Table):
@@ -89,4 +120,8 @@ class FixtureTable(iommi.Table):
         rows = models.Fixture.objects.all().distinct()
         title = "Results"
         page_size = 30
+        parts__page__call_target = pagination.KeysetPaginator
+        parts__page__key = ("-started", "-id")
+        endpoints__rows__func = pagination.rows_endpoint
+        sortable = False
         actions__create = iommi.Action(attrs__href=lambda **_: models.Fixture.create_url())
@@ -2,11 +2,11 @@ from django import urls
 from django.views import generic
 from iommi import path
 
-from gamenight.games import consumers, forms, models, tables, views
+from gamenight.games import api, consumers, forms, models, tables, views
 
 path.register_path_decoding(
     game_slug=models.Game.slug,
-    fixture=models.Fixture,
+    fixture=lambda string, **_: models.Fixture.objects.select_related("game").get(pk=string),
 )
 
 fixture_patterns = [
@@ -28,6 +28,7 @@ fixture_patterns = [
     urls.path("create/", forms.FixtureCreateForm().as_view(), name="create"),
     urls.path("view/<fixture>/", views.FixtureDetailPage().as_view(), name="detail"),
     urls.path("update/<fixture>/", views.FixtureUpdatePage().as_view(), name="update"),
+    urls.path("update/<fixture>/move/", views.move_rank, name="move"),
 ]
 
 
@@ -41,6 +42,14 @@ user_patterns = [
     urls.path("", views.UsersPage().as_view(), name="table"),
     urls.path("detail/", views.UserDetailPage().as_view(), name="detail"),
     urls.path("login/token/<str:username>/<str:encrypted_password>", views.qr_login, name="qr"),
+    urls.path("qrcode/<str:username>.png", views.qrcode_image, name="qrcode"),
+]
+
+
+api_patterns = [
+    urls.path("leaderboard/", api.leaderboard_view, name="leaderboard"),
+    urls.path("fixtures/", api.fixtures_view, name="fixtures"),
+    urls.path("fixtures/<uuid:pk>/", api.fixture_view, name="fixture"),
 ]
 
 
@@ -49,6 +58,7 @@ urlpatterns = [
     urls.path("users/", urls.include((user_patterns, "users"))),
     urls.path("games/", urls.include((game_patterns, "games"))),
     urls.path("fixtures/", urls.include((fixture_patterns, "fixtures"))),
+    urls.path("api/", urls.include((api_patterns, "api"))),
 ]
 
 websocket_urlpatterns = [
@@ -57,4 +67,9 @@ websocket_urlpatterns = [
         consumers.UserScoreConsumer.as_asgi(),
         name="ws--user-score",
     ),
+    urls.re_path(
+        r"ws/leaderboard$",
+        consumers.LeaderboardConsumer.as_asgi(),
+        name="ws--leaderboard",
+    ),
 ]
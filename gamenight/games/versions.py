@@ -0,0 +1,34 @@
+"""Version counters in the cache, shared by every process.
+
+Each process keeps its copy of some data (or clients keep a response) tagged with the version it
+was built from, and rebuilds it once the version in the cache moves on. Versions start from a
+random number, so they are not reused if the cache is cleared.
+"""
+
+import secrets
+
+from django.core.cache import cache
+
+
+def initial() -> int:
+    """Pick a version to start counting from."""
+    return secrets.randbelow(2**31)
+
+
+def get(key: str) -> int:
+    """Get the current version, starting one if there is none yet."""
+    return cache.get_or_set(key, initial, timeout=None) or 0
+
+
+def bump(key: str) -> int:
+    """Move the version on, returning the new version."""
+    return incr(key, start=initial())
+
+
+def incr(key: str, start: int = 0) -> int:
+    """Increment a counter, starting it from start if there is none yet."""
+    try:
+        return cache.incr(key)
+    except ValueError:
+        cache.add(key, start, timeout=None)
+        return cache.incr(key)
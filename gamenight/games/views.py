@@ -4,11 +4,15 @@ import logging
 import iommi  # type: ignore[import]
 import iommi.templates
 from cryptography import fernet
-from django import http, urls
+from django import http, shortcuts, urls
 from django.conf import settings
 from django.contrib import auth
+from django.contrib.auth import decorators as auth_decorators
+from django.template import loader
+from django.utils import cache
+from django.views.decorators import http as http_decorators
 from django_ratelimit import decorators
-from iommi import html
+from iommi import html, path
 
 from gamenight.games import forms, models, tables
 
@@ -33,8 +37,65 @@ def qr_login(
     return http.HttpResponseRedirect(urls.reverse("users:table"))
 
 
+@auth_decorators.login_required
+@http_decorators.require_safe
+def qrcode_image(request: http.HttpRequest, username: str) -> http.HttpResponse:
+    """Serve a user's QR code, to the user themselves or to staff.
+
+    The image is tagged with a digest of the URL it encodes, so browsers only download it again
+    once the code changes.
+    """
+    user = request.user
+    if username != user.username:
+        if not user.is_staff:
+            raise http.Http404
+        user = shortcuts.get_object_or_404(models.User, username=username)
+    assert isinstance(user, models.User)
+    etag = f'"{user.get_qrcode_digest()}"'
+    if (not_modified := cache.get_conditional_response(request, etag=etag)) is not None:
+        return not_modified
+    response = http.HttpResponse(user.get_qrcode_png(), content_type="image/png")
+    response["ETag"] = etag
+    cache.patch_cache_control(response, private=True, no_cache=True)
+    return response
+
+
+@http_decorators.require_POST
+@path.decode_path
+def move_rank(request: http.HttpRequest, fixture: models.Fixture) -> http.HttpResponse:
+    """Save one move in the ranking form, and render only the rank groups it changed.
+
+    The groups are swapped in out of band, so ranking a fixture is one small round trip per move,
+    rather than a post of the whole form and a render of the whole page.
+    """
+    try:
+        affected = fixture.move_rank(
+            request.POST.get("username", ""),
+            int(request.POST.get("rank", "")),
+            request.POST.get("team", "").strip(),
+        )
+    except ValueError as e:
+        return http.HttpResponseBadRequest(str(e))
+    if not affected:
+        return http.HttpResponse()
+    fixture.save(update_fields=["graph"])
+    groups = fixture.get_grouped_ranks()
+    num_users = sum(map(len, groups.values()))
+    return http.HttpResponse(
+        "".join(
+            loader.render_to_string(
+                "chunk/rank_group.html",
+                {"rank": rank, "users": groups.get(rank, []), "num_users": num_users, "oob": True},
+                request,
+            )
+            for rank in sorted(affected)
+        ),
+    )
+
+
 class UserDetailPage(iommi.Page):
     title = html.h1("Profile")
+    stats = tables.UserGameStatsTable()
     change_password_header = html.h2("Change Password")
     change_password = forms.UserChangePasswordForm()
     qrcode_header = html.h2("Your Current QR Code")
@@ -67,6 +128,9 @@ class FixturePage(iommi.Page):
 class FixtureDetailPage(iommi.Page):
     body = iommi.Fragment(template="games/fixture_detail.html")
 
+    class Meta:
+        context__ranks = lambda params, **_: params.fixture.rank_set.select_related("user")  # noqa: E731
+
 
 class FixtureCreatePage(iommi.Page):
     form = forms.FixtureCreateForm()
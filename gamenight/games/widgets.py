@@ -1,9 +1,7 @@
 from django import forms
-from django.utils import safestring
+from django.utils import html, safestring
 
 
-class Base64ImageWidget(forms.widgets.Widget):
+class ImageWidget(forms.widgets.Widget):
     def render(self, name: str, value: str, **_) -> safestring.SafeString:  # type: ignore[override]
-        return safestring.mark_safe(  # noqa: S308
-            f'<img src="data:image/png;base64,{value}" name={name} width="200" height="200" />',
-        )
+        return html.format_html('<img src="{}" name={} width="200" height="200" />', value, name)
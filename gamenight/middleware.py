@@ -7,14 +7,27 @@ from django.conf import settings
 from django.contrib.auth import middleware
 from django.contrib.auth.views import redirect_to_login
 from django.shortcuts import resolve_url
+from iommi import profiling
 
 
 class LoginRequiredMiddleware(middleware.LoginRequiredMiddleware):  # type: ignore[name-defined]
     """Middleware that redirects all unauthenticated requests to a login page.
 
-    Views using the login_not_required decorator will not be redirected.
+    Views using the login_not_required decorator will not be redirected, and do not have their
+    user looked up before they run.
     """
 
+    def process_view(
+        self,
+        request: http.HttpRequest,
+        view_func: Callable,
+        view_args: list,
+        view_kwargs: dict,
+    ) -> http.HttpResponse | None:
+        if not getattr(view_func, "login_required", True):
+            return None
+        return super().process_view(request, view_func, view_args, view_kwargs)
+
     def handle_no_permission(
         self,
         request: http.HttpRequest,
@@ -41,3 +54,16 @@ class LoginRequiredMiddleware(middleware.LoginRequiredMiddleware):  # type: igno
             resolved_login_url,
             self.get_redirect_field_name(view_func),
         )
+
+
+class ProfilingMiddleware(profiling.Middleware):
+    """iommi's profiling middleware, which only looks the user up when asked to profile.
+
+    iommi checks whether the user is staff on every request, which reads the session and the
+    user even for responses that need neither, such as the 304s of the API.
+    """
+
+    def __call__(self, request: http.HttpRequest) -> http.HttpResponse:
+        if "_iommi_prof" not in request.GET and "_iommi_prof" not in request.POST:
+            return self.get_response(request)
+        return super().__call__(request)
@@ -74,7 +74,7 @@ MIDDLEWARE = [
     "django.contrib.messages.middleware.MessageMiddleware",
     "django.middleware.clickjacking.XFrameOptionsMiddleware",
     "iommi.sql_trace.Middleware",
-    "iommi.profiling.Middleware",
+    "gamenight.middleware.ProfilingMiddleware",
     "iommi.middleware",
 ]
 
@@ -99,7 +99,21 @@ TEMPLATES = [
 
 WSGI_APPLICATION = "gamenight.wsgi.application"
 ASGI_APPLICATION = "gamenight.asgi.application"
-CHANNEL_LAYERS = {"default": {"BACKEND": "channels.layers.InMemoryChannelLayer"}}
+
+REDIS_URL = os.environ.get("REDIS_URL", "redis://127.0.0.1:6379")
+
+# The in-memory layer only reaches consumers in the same process; use "redis" whenever more than
+# one worker serves websockets.
+CHANNEL_LAYER = os.environ.get("CHANNEL_LAYER", "memory")
+CHANNEL_LAYERS = {
+    "memory": {"default": {"BACKEND": "channels.layers.InMemoryChannelLayer"}},
+    "redis": {
+        "default": {
+            "BACKEND": "channels_redis.pubsub.RedisPubSubChannelLayer",
+            "CONFIG": {"hosts": [REDIS_URL]},
+        },
+    },
+}[CHANNEL_LAYER]
 
 
 # Database
@@ -122,7 +136,7 @@ DATABASES = {  # type: ignore[var-annotated]
 CACHES = {
     "default": {
         "BACKEND": "django.core.cache.backends.redis.RedisCache",
-        "LOCATION": "redis://127.0.0.1:6379",
+        "LOCATION": REDIS_URL,
     },
 }
 
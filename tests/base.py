@@ -1,14 +1,55 @@
+import contextlib
 import json
 import logging
+import math
 import random
+from collections.abc import Iterator
 
 from django import test
 from django.conf import settings
+from django.core.cache import cache
+from django.db import connection
+from django.db.models import QuerySet
 from model_bakery import baker
 
 from gamenight.games import models
 
 
+def elo_delta(
+    game: models.Game,
+    source_rank: int,
+    source_score: float,
+    target_rank: int,
+    target_score: float,
+) -> int:
+    """The scalar ELO update for two players, kept as a reference for the vectorized engine."""
+    target_q = 10 ** (target_score / 400)
+    source_q = 10 ** (source_score / 400)
+    target_expected = target_q / (target_q + source_q)
+    win_lose_draw = 0.5 if target_rank == source_rank else float(target_rank < source_rank)
+    delta = game.importance * (win_lose_draw - target_expected)
+    if game.randomness:
+        delta *= 1 - (game.randomness / 2)
+    return math.trunc(delta)
+
+
+@contextlib.contextmanager
+def capture_queries() -> Iterator[list[str]]:
+    """Capture the SQL executed inside the block.
+
+    This hooks execute_wrapper rather than the debug cursor, since iommi's SQL trace middleware
+    replaces the debug cursor (and so breaks CaptureQueriesContext) once a request is made.
+    """
+    queries: list[str] = []
+
+    def wrapper(execute, sql, params, many, context):
+        queries.append(sql)
+        return execute(sql, params, many, context)
+
+    with connection.execute_wrapper(wrapper):
+        yield queries
+
+
 class ModelsMixin:
     def make_user(self, **kwargs) -> models.User:
         return baker.make("games.User", **kwargs)
@@ -57,6 +98,56 @@ class ModelsMixin:
                     fixture.rank_set.exclude(pk=players[0][1].pk).update(rank=2)
         return fixture
 
+    def play_fixtures(
+        self,
+        users: list[models.User],
+        count: int,
+        *,
+        games: list[models.Game] | None = None,
+        players: int = 3,
+        rotate: int = 3,
+    ) -> list[models.Fixture]:
+        """Finish fixtures between the users in turn, cycling through the games.
+
+        Each fixture starts one user further along, wrapping around after rotate users, so the
+        players overlap from one fixture to the next.
+        """
+        games = games or [self.make_game(ranked=True)]
+        fixtures = []
+        for i in range(count):
+            rotated = users[i % rotate :] + users[: i % rotate]
+            game = games[i % len(games)]
+            fixture = self.make_fixture(users=rotated[:players], game=game, rank_users=True)
+            fixture.finish()
+            fixtures.append(fixture)
+        return fixtures
 
-class BaseTestCase(test.TestCase, ModelsMixin):
+    @staticmethod
+    def snapshot(*querysets: QuerySet) -> list[set]:
+        """Get the rows of each queryset, to compare before and after a change."""
+        return [set(queryset.all()) for queryset in querysets]
+
+
+class TestCaseMixin:
+    def setUp(self) -> None:
+        super().setUp()
+        cache.clear()
+
+    @contextlib.contextmanager
+    def assertNumQueries(self, num: int, *_, **__) -> Iterator[None]:  # noqa: N802
+        with capture_queries() as queries:
+            yield
+        self.assertEqual(len(queries), num, "\n".join(queries))
+
+
+LOCAL_CACHES = {"default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"}}
+
+
+@test.override_settings(CACHES=LOCAL_CACHES)
+class BaseTestCase(TestCaseMixin, test.TestCase, ModelsMixin):
     pass
+
+
+@test.override_settings(CACHES=LOCAL_CACHES)
+class BaseTransactionTestCase(TestCaseMixin, test.TransactionTestCase, ModelsMixin):
+    """For tests running consumers, which close the database connection between messages."""
@@ -0,0 +1,141 @@
+import uuid
+
+from django import urls
+
+from gamenight.games import api
+from gamenight.games.models import utils
+from tests import base
+
+
+class TestLeaderboardAPI(base.BaseTestCase):
+    url = urls.reverse("api:leaderboard")
+
+    def test_leaderboard(self):
+        user = self.make_user(username="a", score=1100)
+        self.make_user(username="b", score=900)
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(
+            response.json()["entries"],
+            [
+                {"position": 1, "username": "a", "score": 1100},
+                {"position": 2, "username": "b", "score": 900},
+            ],
+        )
+
+        # Polling with the tag costs nothing, even for anonymous clients.
+        with self.assertNumQueries(0):
+            response = self.client.get(self.url, headers={"If-None-Match": response["ETag"]})
+        self.assertEqual(response.status_code, 304)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            user.score = 800
+            user.save()
+        response = self.client.get(self.url, headers={"If-None-Match": response["ETag"]})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()["entries"][0]["username"], "b")
+
+
+class TestFixturesAPI(base.BaseTestCase):
+    url = urls.reverse("api:fixtures")
+
+    def setUp(self):
+        super().setUp()
+        self.client.force_login(self.make_user())
+        self.game = self.make_game(minimum_players=2, maximum_players=None, ranked=True)
+
+    def make_fixtures(self, n: int) -> None:
+        users = [self.make_user() for _ in range(4)]
+        with self.captureOnCommitCallbacks(execute=True):
+            fixtures = [
+                self.make_fixture(game=self.game, users=users, rank_users=True) for _ in range(n)
+            ]
+            for fixture in fixtures[: n // 2]:
+                fixture.finish()
+
+    def test_fixtures(self):
+        # Session, user, the ongoing and ended fixtures, and their players.
+        for n in [2, 20]:
+            self.make_fixtures(n)
+            with self.assertNumQueries(5):
+                response = self.client.get(self.url)
+            self.assertEqual(response.status_code, 200)
+            data = response.json()
+            self.assertEqual(len(data["ongoing"]), len(data["ended"]))
+            self.assertEqual(data["ongoing"][0]["game_name"], self.game.name)
+            self.assertEqual(len(data["ongoing"][0]["players"]), 4)
+
+    def test_ended_limit(self):
+        self.make_fixtures(2 * api.ENDED_LIMIT + 2)
+        data = self.client.get(self.url).json()
+        self.assertEqual(len(data["ended"]), api.ENDED_LIMIT)
+
+    def test_not_modified(self):
+        self.make_fixtures(2)
+        etag = self.client.get(self.url)["ETag"]
+        # The tag is checked before the session and user are read.
+        with self.assertNumQueries(0):
+            response = self.client.get(self.url, headers={"If-None-Match": etag})
+        self.assertEqual(response.status_code, 304)
+
+        self.make_fixtures(2)
+        response = self.client.get(self.url, headers={"If-None-Match": etag})
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response["ETag"], etag)
+
+    def test_changed_ranks(self):
+        users = [self.make_user() for _ in range(3)]
+        with self.captureOnCommitCallbacks(execute=True):
+            fixture = self.make_fixture(game=self.game, users=users)
+        etag = self.client.get(self.url)["ETag"]
+        with self.captureOnCommitCallbacks(execute=True):
+            fixture.set_flat_ranks([f"{i}--{user.username}--" for i, user in enumerate(users, 1)])
+        self.assertNotEqual(self.client.get(self.url)["ETag"], etag)
+
+    def test_renamed_game(self):
+        self.make_fixtures(2)
+        etag = self.client.get(self.url)["ETag"]
+        with self.captureOnCommitCallbacks(execute=True):
+            self.game.name = "Renamed"
+            self.game.save()
+        response = self.client.get(self.url, headers={"If-None-Match": etag})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()["ongoing"][0]["game_name"], "Renamed")
+
+    def test_replay(self):
+        self.make_fixtures(2)
+        etag = self.client.get(self.url)["ETag"]
+        with self.captureOnCommitCallbacks(execute=True):
+            utils.replay_scores()
+        self.assertNotEqual(self.client.get(self.url)["ETag"], etag)
+
+    def test_fixture(self):
+        users = [self.make_user(username=name) for name in ["a", "b", "c"]]
+        with self.captureOnCommitCallbacks(execute=True):
+            fixture = self.make_fixture(game=self.game, users=users)
+            fixture.set_flat_ranks(["1--b--", "2--a--", "3--c--"])
+            fixture.finish()
+        url = urls.reverse("api:fixture", kwargs={"pk": fixture.pk})
+        # Session, user, the fixture and its ranks.
+        with self.assertNumQueries(4):
+            response = self.client.get(url)
+        data = response.json()
+        self.assertEqual(data["id"], str(fixture.pk))
+        self.assertTrue(data["applied"])
+        self.assertEqual([rank["username"] for rank in data["ranks"]], ["b", "a", "c"])
+        self.assertEqual(sum(rank["delta"] for rank in data["ranks"]), 0)
+        self.assertGreater(data["ranks"][0]["delta"], 0)
+
+        with self.assertNumQueries(0):
+            not_modified = self.client.get(url, headers={"If-None-Match": response["ETag"]})
+        self.assertEqual(not_modified.status_code, 304)
+
+    def test_fixture__missing(self):
+        url = urls.reverse("api:fixture", kwargs={"pk": uuid.uuid4()})
+        self.assertEqual(self.client.get(url).status_code, 404)
+
+    def test_anonymous(self):
+        self.client.logout()
+        self.assertEqual(self.client.get(self.url).status_code, 302)
+        url = urls.reverse("api:fixture", kwargs={"pk": uuid.uuid4()})
+        self.assertEqual(self.client.get(url).status_code, 302)
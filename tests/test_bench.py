@@ -0,0 +1,60 @@
+import io
+import json
+import pathlib
+import tempfile
+
+from django.core import management
+
+from gamenight.games import models
+from tests import base
+
+
+class TestBenchCommand(base.BaseTestCase):
+    def test_quick(self):
+        with tempfile.TemporaryDirectory() as directory:
+            output = pathlib.Path(directory) / "bench.json"
+            management.call_command(
+                "bench",
+                "--quick",
+                "--repeat=2",
+                f"--output={output}",
+                stdout=io.StringIO(),
+            )
+            results = json.loads(output.read_text())["results"]
+        self.assertEqual(
+            [(r["name"], r["size"]) for r in results],
+            [
+                ("fixture.finish", 2),
+                ("fixture.finish", 4),
+                ("replay", 20),
+                ("fixtures page", 10),
+                ("users page", 10),
+                ("fanout", 10),
+            ],
+        )
+        for result in results:
+            self.assertEqual(len(result["seconds"]), 2)
+            self.assertEqual(len(result["queries"]), 2)
+        # The data created for the benchmarks is rolled back.
+        self.assertFalse(models.User.objects.exists())
+        self.assertFalse(models.Fixture.objects.exists())
+
+    def test_compare(self):
+        with tempfile.TemporaryDirectory() as directory:
+            output = pathlib.Path(directory) / "bench.json"
+            stdout = io.StringIO()
+            management.call_command(
+                "bench",
+                "fanout",
+                "--quick",
+                f"--output={output}",
+                stdout=stdout,
+            )
+            management.call_command(
+                "bench",
+                "fanout",
+                "--quick",
+                f"--compare={output}",
+                stdout=stdout,
+            )
+        self.assertRegex(stdout.getvalue(), r"fanout +10 .*\(\d+\.\d+x\)")
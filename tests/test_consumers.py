@@ -0,0 +1,236 @@
+import asyncio
+import os
+import subprocess
+import sys
+import threading
+
+from asgiref import sync
+from channels import layers
+from channels.testing import WebsocketCommunicator
+from django import db, test
+from django.conf import settings
+from fakeredis import TcpFakeServer
+
+from gamenight.games import consumers, leaderboard, models
+from tests import base
+
+
+class TestLeaderboardConsumer(base.BaseTransactionTestCase):
+    async def connect(self) -> WebsocketCommunicator:
+        communicator = WebsocketCommunicator(
+            consumers.LeaderboardConsumer.as_asgi(),
+            "/ws/leaderboard",
+        )
+        connected, _ = await communicator.connect()
+        self.assertTrue(connected)
+        return communicator
+
+    async def test_connect__initial_state(self):
+        for i in range(3):
+            await sync.sync_to_async(self.make_user)(username=f"user{i}", score=1000 + i)
+        communicator = await self.connect()
+        frame = await communicator.receive_from()
+        for i in range(3):
+            self.assertIn(f'<div id="user{i}-score" class="sort-key">{1000 + i}</div>', frame)
+        self.assertIn('<div id="user2-position">1</div>', frame)
+        await communicator.disconnect()
+
+    async def test_leaderboard_changed__diff(self):
+        for i in range(3):
+            await sync.sync_to_async(self.make_user)(username=f"user{i}", score=1000 + i)
+        communicator = await self.connect()
+        await communicator.receive_from()
+        await models.User.objects.filter(username="user0").aupdate(score=1001)
+        await sync.sync_to_async(leaderboard.refresh)()
+        await layers.get_channel_layer().group_send(
+            models.user.LEADERBOARD_GROUP,
+            {"type": "leaderboard.changed", "scores": {"user0": 1001}},
+        )
+        frame = await communicator.receive_from()
+        # user0 moves into a tie for 2nd with user1; user2 is unchanged.
+        self.assertIn('<div id="user0-score" class="sort-key">1001</div>', frame)
+        self.assertIn('<div id="user0-position">2</div>', frame)
+        self.assertNotIn("user1", frame)
+        self.assertNotIn("user2", frame)
+        await communicator.disconnect()
+
+    async def test_leaderboard_changed__summary(self):
+        await sync.sync_to_async(self.make_user)(username="user0", score=1000)
+        communicator = await self.connect()
+        await communicator.receive_from()
+        await models.User.objects.filter(username="user0").aupdate(score=1234)
+        await sync.sync_to_async(leaderboard.refresh)()
+        await layers.get_channel_layer().group_send(
+            models.user.SUMMARY_GROUP,
+            {"type": "leaderboard.changed", "scores": {"user0": 1234}},
+        )
+        self.assertIn(
+            '<div id="user0-score" class="sort-key">1234</div>',
+            await communicator.receive_from(),
+        )
+        await communicator.disconnect()
+
+    async def test_receive__resends_everything(self):
+        await sync.sync_to_async(self.make_user)(username="user0")
+        communicator = await self.connect()
+        first = await communicator.receive_from()
+        await communicator.send_to(text_data='{"refresh": true}')
+        self.assertEqual(await communicator.receive_from(), first)
+        await communicator.disconnect()
+
+    async def test_receive__loaded_rows(self):
+        page_size = leaderboard.PAGE_SIZE
+        for i in range(page_size + 5):
+            await sync.sync_to_async(self.make_user)(username=f"user{i:02}", score=2000 - i)
+        communicator = await self.connect()
+        # Only the first page of rows is on the page to begin with.
+        frame = await communicator.receive_from()
+        self.assertEqual(frame.count("-score"), page_size)
+        self.assertNotIn(f"user{page_size:02}", frame)
+        # A change to a row that is not loaded is not sent.
+        await models.User.objects.filter(username=f"user{page_size:02}").aupdate(score=0)
+        await sync.sync_to_async(leaderboard.refresh)()
+        await layers.get_channel_layer().group_send(
+            models.user.LEADERBOARD_GROUP,
+            {"type": "leaderboard.changed", "scores": {f"user{page_size:02}": 0}},
+        )
+        self.assertTrue(await communicator.receive_nothing())
+        # Once the client loads the next page, its rows are sent too.
+        await communicator.send_to(text_data=f'{{"rows": {page_size + 5}}}')
+        frame = await communicator.receive_from()
+        self.assertEqual(frame.count("-score"), 5)
+        self.assertIn(f'<div id="user{page_size:02}-score" class="sort-key">0</div>', frame)
+        await communicator.send_to(text_data="[]")
+        self.assertTrue(await communicator.receive_nothing())
+        await communicator.disconnect()
+
+
+class TestUserScoreConsumer(base.BaseTransactionTestCase):
+    def setUp(self) -> None:
+        super().setUp()
+        # A local stand-in for the Redis server shared by every worker process.
+        self.redis = TcpFakeServer(("127.0.0.1", 0), server_type="redis")
+        threading.Thread(target=self.redis.serve_forever, daemon=True).start()
+        self.addCleanup(self.redis.server_close)
+        self.addCleanup(self.redis.shutdown)
+        host, port = self.redis.server_address[:2]
+        self.redis_url = f"redis://{host}:{port}"
+
+    async def connect(self, username: str) -> WebsocketCommunicator:
+        communicator = WebsocketCommunicator(
+            consumers.UserScoreConsumer.as_asgi(),
+            f"/ws/users/{username}/score",
+        )
+        communicator.scope["url_route"] = {"kwargs": {"username": username}}
+        connected, _ = await communicator.connect()
+        self.assertTrue(connected)
+        return communicator
+
+    def save_in_other_process(self, username: str, score: int) -> None:
+        """Save a user from a separate process, as another worker would."""
+        env = {
+            **os.environ,
+            "CHANNEL_LAYER": "redis",
+            "REDIS_URL": self.redis_url,
+            "PGDATABASE": db.connection.settings_dict["NAME"],
+        }
+        script = (
+            "from gamenight.games import models\n"
+            f"user = models.User.objects.get(username={username!r})\n"
+            f"user.score = {score}\n"
+            "user.save()\n"
+        )
+        subprocess.run(  # noqa: S603
+            [sys.executable, "manage.py", "shell", "-c", script],
+            cwd=settings.BASE_DIR,
+            env=env,
+            check=True,
+            capture_output=True,
+        )
+
+    async def test_save__reaches_other_process(self):
+        await sync.sync_to_async(self.make_user)(username="user0", score=1000)
+        channel_layers = {
+            "default": {
+                "BACKEND": "channels_redis.pubsub.RedisPubSubChannelLayer",
+                "CONFIG": {"hosts": [self.redis_url]},
+            },
+        }
+        with test.override_settings(CHANNEL_LAYERS=channel_layers):
+            communicator = await self.connect("user0")
+            self.assertEqual(
+                await communicator.receive_from(),
+                '<div id="user0-score" class="sort-key">1000</div>',
+            )
+            await asyncio.to_thread(self.save_in_other_process, "user0", 1234)
+            self.assertEqual(
+                await communicator.receive_from(timeout=5),
+                '<div id="user0-score" class="sort-key">1234</div>',
+            )
+            await communicator.disconnect()
+
+    async def test_user_score__zero(self):
+        await sync.sync_to_async(self.make_user)(username="user0", score=1000)
+        communicator = await self.connect("user0")
+        await communicator.receive_from()
+        await layers.get_channel_layer().group_send(
+            "user0",
+            {"type": "user.score", "score": 0},
+        )
+        self.assertEqual(
+            await communicator.receive_from(),
+            '<div id="user0-score" class="sort-key">0</div>',
+        )
+        await communicator.disconnect()
+
+    async def test_leaderboard_changed__ignored(self):
+        await sync.sync_to_async(self.make_user)(username="user0", score=1000)
+        communicator = await self.connect("user0")
+        await communicator.receive_from()
+        await sync.sync_to_async(self.make_user)(username="user1", score=1000)
+        await models.User.objects.filter(username="user0").aupdate(score=1234)
+        # Outside a transaction, the scores are broadcast straight away.
+        await sync.sync_to_async(models.user.score_broadcasts.add)("user0", "user1")
+        # Only the user's own score, once, and nothing for anyone else.
+        self.assertEqual(
+            await communicator.receive_from(),
+            '<div id="user0-score" class="sort-key">1234</div>',
+        )
+        self.assertTrue(await communicator.receive_nothing())
+        await communicator.disconnect()
+
+    async def test_leaderboard_changed__summary(self):
+        await sync.sync_to_async(self.make_user)(username="user0", score=1000)
+        communicator = await self.connect("user0")
+        await communicator.receive_from()
+        await layers.get_channel_layer().group_send(
+            models.user.SUMMARY_GROUP,
+            {"type": "leaderboard.changed", "scores": {"user0": 1234, "user1": 900}},
+        )
+        self.assertEqual(
+            await communicator.receive_from(),
+            '<div id="user0-score" class="sort-key">1234</div>',
+        )
+        await layers.get_channel_layer().group_send(
+            models.user.SUMMARY_GROUP,
+            {"type": "leaderboard.changed", "scores": {"user1": 950}},
+        )
+        self.assertTrue(await communicator.receive_nothing())
+        await communicator.disconnect()
+
+    async def test_receive__rate_limited(self):
+        await sync.sync_to_async(self.make_user)(username="user0", score=1000)
+        first, second = await self.connect("user0"), await self.connect("user0")
+        await first.receive_from()
+        await second.receive_from()
+        frame = '<div id="user0-score" class="sort-key">1000</div>'
+        # The first refresh is broadcast to every client.
+        await first.send_to(text_data="{}")
+        self.assertEqual(await first.receive_from(), frame)
+        self.assertEqual(await second.receive_from(), frame)
+        # Refreshing again right away is only answered on the refreshing socket.
+        await first.send_to(text_data="{}")
+        self.assertEqual(await first.receive_from(), frame)
+        self.assertTrue(await second.receive_nothing())
+        await first.disconnect()
+        await second.disconnect()
@@ -0,0 +1,69 @@
+from django import urls
+from django.db.models import Q
+
+from gamenight.games import eligibility, models
+from tests import base
+
+
+class TestEligibility(base.BaseTestCase):
+    def setUp(self):
+        super().setUp()
+        self.duel = self.make_game(name="Duel", minimum_players=2, maximum_players=2)
+        self.party = self.make_game(name="Party", minimum_players=4, maximum_players=None)
+        self.cards = self.make_game(name="Cards", minimum_players=2, maximum_players=6)
+
+    def test_for_players(self):
+        self.assertEqual(eligibility.for_players(1), [])
+        self.assertEqual(eligibility.for_players(2), [self.cards, self.duel])
+        self.assertEqual(eligibility.for_players(4), [self.cards, self.party])
+        self.assertEqual(eligibility.for_players(7), [self.party])
+        self.assertEqual(eligibility.for_players(80), [self.party])
+        # The index agrees with the database, for every number of players.
+        for count in range(eligibility.MAX_PLAYERS + 10):
+            games = models.Game.objects.filter(minimum_players__lte=count).filter(
+                Q(maximum_players__gte=count) | Q(maximum_players=None),
+            )
+            self.assertEqual(eligibility.for_players(count), list(games.order_by("name")))
+
+    def test_cached(self):
+        eligibility.for_players(2)
+        with self.assertNumQueries(0):
+            for count in range(eligibility.MAX_PLAYERS + 10):
+                eligibility.for_players(count)
+
+    def test_game_changed(self):
+        eligibility.for_players(2)
+        self.duel.maximum_players = 3
+        self.duel.save()
+        self.assertEqual(eligibility.for_players(3), [self.cards, self.duel])
+        self.cards.delete()
+        self.assertEqual(eligibility.for_players(3), [self.duel])
+        new = self.make_game(name="Another", minimum_players=2, maximum_players=None)
+        self.assertEqual(eligibility.for_players(3), [new, self.duel])
+
+    def test_create_form(self):
+        self.client.force_login(self.make_user())
+        users = [self.make_user(username=f"user{i}") for i in range(4)]
+        url = urls.reverse("fixtures:create")
+        eligibility.for_players(4)
+        with base.capture_queries() as queries:
+            response = self.client.get(url, {"users": [user.username for user in users]})
+        self.assertEqual(response.status_code, 200)
+        self.assertFalse([sql for sql in queries if "games_game" in sql], queries)
+        content = response.content.decode()
+        self.assertIn("Party (~1m)", content)
+        self.assertNotIn("Duel", content)
+
+        data = {"users": [user.username for user in users], "-submit": ""}
+        response = self.client.post(url, {**data, "game": self.duel.pk})
+        self.assertEqual(response.status_code, 200)
+        self.assertFalse(models.Fixture.objects.exists())
+        response = self.client.post(url, {**data, "game": self.party.pk})
+        fixture = models.Fixture.objects.get()
+        self.assertRedirects(
+            response,
+            urls.reverse("fixtures:update", kwargs={"fixture": fixture.pk}),
+            fetch_redirect_response=False,
+        )
+        self.assertEqual(fixture.game, self.party)
+        self.assertEqual(fixture.users.count(), 4)
@@ -0,0 +1,84 @@
+import random
+
+import numpy as np
+
+from gamenight.games import elo, models
+from tests import base
+
+
+def reference_deltas(
+    game: models.Game,
+    ranks: list[int],
+    scores: list[int],
+    teams: list[str],
+) -> np.ndarray:
+    """The per-pair rules of the original graph builder, one scalar ELO update at a time."""
+    n = len(ranks)
+    deltas = np.zeros((n, n), dtype=np.int64)
+    for j in range(n):
+        for i in range(n):
+            if i == j or ranks[i] < ranks[j]:
+                continue
+            if ranks[i] == ranks[j] and scores[i] <= scores[j]:
+                continue
+            if teams[j] and teams[i] == teams[j]:
+                continue
+            deltas[i, j] = base.elo_delta(game, ranks[i], scores[i], ranks[j], scores[j])
+    for i in range(n):
+        if (arcs := np.count_nonzero(deltas[i])) > 1:
+            for j in deltas[i].nonzero()[0]:
+                deltas[i, j] = max(deltas[i, j] // arcs, 5)
+    return deltas
+
+
+class TestPairwiseDeltas(base.BaseTestCase):
+    def compute(self, game: models.Game, ranks: list[int], scores: list[int], teams: list[str]):
+        return elo.pairwise_deltas(
+            ranks,
+            scores,
+            teams,
+            importance=game.importance,
+            randomness=game.randomness,
+        )
+
+    def test_two_players(self):
+        game = models.Game(estimated_duration=10)
+        deltas = self.compute(game, [1, 2], [1000, 1000], ["", ""])
+        np.testing.assert_array_equal(deltas, [[0, 0], [10, 0]])
+
+    def test_draw__lower_score_gains(self):
+        game = models.Game(estimated_duration=10)
+        deltas = self.compute(game, [1, 1], [1200, 1000], ["", ""])
+        self.assertEqual(deltas[1, 0], 0)
+        self.assertGreater(deltas[0, 1], 0)
+        # Equal scores trade nothing.
+        deltas = self.compute(game, [1, 1], [1000, 1000], ["", ""])
+        self.assertFalse(deltas.any())
+
+    def test_teams__do_not_trade(self):
+        game = models.Game(estimated_duration=10)
+        deltas = self.compute(game, [1, 1, 2, 2], [1000] * 4, ["a", "a", "b", "b"])
+        self.assertEqual(deltas[1, 0], 0)
+        self.assertEqual(deltas[3, 2], 0)
+        self.assertEqual(np.count_nonzero(deltas), 4)
+
+    def test_split__minimum(self):
+        game = models.Game(estimated_duration=1)
+        deltas = self.compute(game, [1, 2, 3, 4], [1000] * 4, ["", "", "", ""])
+        self.assertEqual(deltas[3].tolist(), [5, 5, 5, 0])
+
+    def test_matches_reference(self):
+        rng = random.Random(0)  # noqa: S311
+        for _ in range(500):
+            game = models.Game(
+                estimated_duration=rng.randint(1, 120),
+                randomness=rng.choice([0.0, rng.random()]),
+            )
+            n = rng.randint(2, 20)
+            ranks = [rng.randint(1, n) for _ in range(n)]
+            scores = [rng.choice([1000, rng.randint(0, 3000)]) for _ in range(n)]
+            teams = [rng.choice(["", "", "red", "blue"]) for _ in range(n)]
+            np.testing.assert_array_equal(
+                self.compute(game, ranks, scores, teams),
+                reference_deltas(game, ranks, scores, teams),
+            )
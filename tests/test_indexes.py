@@ -0,0 +1,60 @@
+from django.db import connection
+from django.db.models import QuerySet
+from django.utils import timezone
+
+from gamenight.games import models, pagination
+from tests import base
+
+
+class TestIndexes(base.BaseTestCase):
+    """The hot queries are served by an index, not a sequential scan.
+
+    The tables are tiny in tests, so sequential scans are disabled to make the planner show
+    which index it would use on a large table.
+    """
+
+    def setUp(self):
+        super().setUp()
+        with connection.cursor() as cursor:
+            cursor.execute("SET LOCAL enable_seqscan = off")
+
+    def assert_uses_index(self, queryset: QuerySet, index: str):
+        plan = queryset.explain()
+        self.assertIn(index, plan)
+        self.assertNotIn("Seq Scan", plan)
+
+    def test_leaderboard(self):
+        self.assert_uses_index(
+            models.User.objects.order_by("-score", "username").values_list("username", "score"),
+            "user_leaderboard",
+        )
+
+    def test_available(self):
+        self.assert_uses_index(models.User.available.order_by("username"), "user_available")
+
+    def test_ongoing_fixtures(self):
+        self.assert_uses_index(
+            models.Fixture.objects.filter(ended=None).order_by("-started", "-id"),
+            "fixture_ongoing",
+        )
+
+    def test_ended_fixtures(self):
+        self.assert_uses_index(
+            models.Fixture.objects.exclude(ended=None).order_by("-started", "-id"),
+            "fixture_ended",
+        )
+
+    def test_ended_fixtures__after_cursor(self):
+        fixture = self.make_fixture(ended=timezone.now())
+        rows = models.Fixture.objects.exclude(ended=None)
+        self.assert_uses_index(
+            pagination.after(rows, ["-started", "-id"], [fixture.started, str(fixture.pk)]),
+            "fixture_ended",
+        )
+
+    def test_fixture_ranks(self):
+        fixture = self.make_fixture(users=[self.make_user() for _ in range(2)])
+        self.assert_uses_index(
+            models.Rank.objects.filter(fixture_id=fixture.pk).order_by("rank"),
+            "rank_fixture_rank",
+        )
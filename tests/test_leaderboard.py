@@ -0,0 +1,121 @@
+from django import urls
+from django.core.cache import cache
+
+from gamenight.games import leaderboard
+from gamenight.games.models import User, utils
+from tests import base
+
+
+class TestLeaderboard(base.BaseTestCase):
+    def test_build__positions(self):
+        for username, score in [("a", 900), ("b", 1100), ("c", 1000), ("d", 1000)]:
+            self.make_user(username=username, score=score)
+        self.assertEqual(
+            leaderboard.build(),
+            [
+                leaderboard.Entry(position=1, username="b", score=1100),
+                leaderboard.Entry(position=2, username="c", score=1000),
+                leaderboard.Entry(position=2, username="d", score=1000),
+                leaderboard.Entry(position=4, username="a", score=900),
+            ],
+        )
+
+    def test_snapshot__cached(self):
+        self.make_user(username="a")
+        with self.assertNumQueries(1):
+            leaderboard.snapshot()
+        with self.assertNumQueries(0):
+            self.assertEqual(leaderboard.snapshot()[0].username, "a")
+        self.assertEqual(leaderboard.stats(), {"hits": 1, "misses": 1, "hit_rate": 0.5})
+
+    def test_snapshot__refreshed_on_commit(self):
+        user = self.make_user(username="a", score=1000)
+        leaderboard.snapshot()
+        version = leaderboard.version()
+        with self.captureOnCommitCallbacks(execute=True):
+            user.score = 1200
+            user.save()
+        self.assertEqual(leaderboard.version(), version + 1)
+        with self.assertNumQueries(0):
+            self.assertEqual(leaderboard.snapshot()[0].score, 1200)
+
+    def test_update(self):
+        for username in "abc":
+            self.make_user(username=username, score=1000)
+        leaderboard.snapshot()
+        User.objects.filter(username="c").update(score=1200)
+        # Only the changed scores are applied, to the snapshot before.
+        with self.assertNumQueries(0):
+            entries = leaderboard.update({"c": 1200})
+        self.assertEqual(entries, leaderboard.build())
+        self.assertEqual([entry.position for entry in entries], [1, 2, 2])
+        with self.assertNumQueries(0):
+            self.assertEqual(leaderboard.snapshot(), entries)
+        # Without a snapshot to apply them to, the leaderboard is rebuilt.
+        cache.clear()
+        User.objects.filter(username="a").update(score=900)
+        with self.assertNumQueries(1):
+            entries = leaderboard.update({"a": 900})
+        self.assertEqual(entries, leaderboard.build())
+
+    def test_snapshot__refreshed_on_replay(self):
+        users = [self.make_user(username=username) for username in "ab"]
+        fixture = self.make_fixture(users=users)
+        fixture.set_flat_ranks(["1--a--", "2--b--"])
+        fixture.finish()
+        User.objects.update(score=1000)
+        leaderboard.snapshot()
+        version = leaderboard.version()
+        with self.captureOnCommitCallbacks(execute=True):
+            utils.replay_scores()
+        self.assertEqual(leaderboard.version(), version + 1)
+        with self.assertNumQueries(0):
+            snapshot = leaderboard.snapshot()
+        self.assertEqual(
+            [(entry.username, entry.score) for entry in snapshot],
+            list(User.objects.order_by("-score").values_list("username", "score")),
+        )
+
+    def test_snapshot__unchanged_by_other_saves(self):
+        user = self.make_user(username="a", score=1000)
+        user.set_password("123456")
+        user.save()
+        version = leaderboard.version()
+        with self.captureOnCommitCallbacks(execute=True):
+            # Logging in with the QR code saves the user's last login.
+            self.client.get(user.qrcode)
+            user = User.objects.get(username="a")
+            self.assertIsNotNone(user.last_login)
+            user.first_name = "Alice"
+            user.save()
+        self.assertEqual(leaderboard.version(), version)
+
+    def test_score__cached(self):
+        user = self.make_user(username="a", score=0)
+        with self.assertNumQueries(1):
+            self.assertEqual(leaderboard.score("a"), 0)
+        with self.assertNumQueries(0):
+            self.assertEqual(leaderboard.score("a"), 0)
+        # Broadcasting a change writes the new score through to the cache.
+        with self.captureOnCommitCallbacks(execute=True):
+            user.score = 1200
+            user.save()
+        with self.assertNumQueries(0):
+            self.assertEqual(leaderboard.score("a"), 1200)
+        self.assertIsNone(leaderboard.score("missing"))
+
+    def test_allow_refresh(self):
+        self.assertTrue(leaderboard.allow_refresh("a"))
+        self.assertFalse(leaderboard.allow_refresh("a"))
+        self.assertTrue(leaderboard.allow_refresh("b"))
+
+    def test_users_page(self):
+        for i in range(3):
+            self.make_user(username=f"user{i}", score=1000 + i)
+        leaderboard.refresh()
+        with self.assertNumQueries(0):
+            response = self.client.get(urls.reverse("users:table"))
+        self.assertEqual(response.status_code, 200)
+        content = response.content.decode()
+        self.assertLess(content.index("user2"), content.index("user1"))
+        self.assertLess(content.index("user1"), content.index("user0"))
@@ -1,11 +1,49 @@
 import datetime
+import json
+import threading
 from unittest import mock
 
-from django.db import IntegrityError
+from django.db import IntegrityError, connection, models
 
+from gamenight.games.models import Fixture, User
 from tests import base
 
 
+def legacy_player_graph(fixture: Fixture) -> list[dict]:
+    """The original query-per-target graph builder, kept as a reference implementation."""
+    edges = {}
+    for target in fixture.rank_set.all().order_by("rank", "user__score"):
+        sources = fixture.rank_set.exclude(pk=target.pk).exclude(
+            models.Q(rank=target.rank) & models.Q(user__score__lte=target.user.score),
+        )
+        sources = sources.filter(rank__gte=target.rank)
+        if target.team:
+            sources = sources.exclude(team=target.team)
+        for source in sources:
+            delta = base.elo_delta(
+                fixture.game,
+                source.rank,
+                source.user.score,
+                target.rank,
+                target.user.score,
+            )
+            if delta != 0:
+                edges[source.pk, target.pk] = delta
+    out_degree = {}
+    for source, _ in edges:
+        out_degree[source] = out_degree.get(source, 0) + 1
+    for (source, target), delta in edges.items():
+        if out_degree[source] > 1:
+            edges[source, target] = max(delta // out_degree[source], 5)
+    return sorted(
+        (
+            {"source": source, "target": target, "delta": delta}
+            for (source, target), delta in edges.items()
+        ),
+        key=lambda edge: (edge["source"], edge["target"]),
+    )
+
+
 class TestFixture(base.BaseTestCase):
     def test_apply_score_updates(self):
         game = self.make_game(ranked=True)
@@ -33,6 +71,67 @@ class TestFixture(base.BaseTestCase):
         fixture.finish()
         self.assertEqual(fixture.ended, ended)
 
+    def test_save__writes_rank_deltas_once(self):
+        users = [self.make_user(score=1000 + 10 * i) for i in range(8)]
+        fixture = self.make_fixture(users=users, game=self.make_game(ranked=True))
+        for i, user in enumerate(users):
+            fixture.rank_set.filter(user=user).update(rank=i + 1)
+        fixture._build_player_graph()
+        with base.capture_queries() as queries:
+            fixture.save()
+        self.assertEqual(len([q for q in queries if "games_rank" in q]), 1)
+        deltas = {}
+        for edge in json.loads(fixture.graph):
+            deltas[edge["source"]] = deltas.get(edge["source"], 0) - edge["delta"]
+            deltas[edge["target"]] = deltas.get(edge["target"], 0) + edge["delta"]
+        for pk, delta in fixture.rank_set.values_list("pk", "delta"):
+            self.assertEqual(delta, deltas.get(pk, 0))
+        # Saving again, or saving a freshly loaded fixture, leaves the ranks alone.
+        for instance in (fixture, Fixture.objects.get(pk=fixture.pk)):
+            with base.capture_queries() as queries:
+                instance.save()
+            self.assertFalse([q for q in queries if "games_rank" in q])
+
+    def test_from_db__deferred_graph(self):
+        users = [self.make_user() for _ in range(2)]
+        game = self.make_game(ranked=True)
+        for _ in range(5):
+            fixture = self.make_fixture(users=users, game=game, rank_users=True)
+            fixture._build_player_graph()
+            fixture.save()
+        with self.assertNumQueries(1):
+            fixtures = list(Fixture.objects.defer("graph"))
+        # Loading the graph later still counts as written, so saving leaves the ranks alone.
+        with base.capture_queries() as queries:
+            fixtures[0].save()
+        self.assertFalse([q for q in queries if "games_rank" in q])
+
+    def test_finish__constant_queries(self):
+        game = self.make_game(ranked=True)
+        counts = []
+        for players in (2, 12):
+            users = [self.make_user() for _ in range(players)]
+            fixture = self.make_fixture(users=users, game=game, rank_users=True)
+            with base.capture_queries() as queries:
+                fixture.finish()
+            counts.append(len(queries))
+        self.assertEqual(counts[0], counts[1])
+
+    def test_finish__stale_instance(self):
+        users = [self.make_user() for _ in range(4)]
+        fixture = self.make_fixture(users=users, game=self.make_game(ranked=True), rank_users=True)
+        stale = Fixture.objects.get(pk=fixture.pk)
+        fixture.finish()
+        scores = {user.pk: user.score for user in User.objects.filter(pk__in=[u.pk for u in users])}
+        self.assertNotEqual(set(scores.values()), {1000})
+        # Finishing a fixture loaded before it was finished changes nothing.
+        stale.finish()
+        self.assertEqual(stale.ended, fixture.ended)
+        self.assertEqual(
+            {user.pk: user.score for user in User.objects.filter(pk__in=[u.pk for u in users])},
+            scores,
+        )
+
     def test_check_constraints(self):
         self.assertRaises(IntegrityError, self.make_fixture, applied=True, ended=None)
 
@@ -98,6 +197,78 @@ class TestFixture(base.BaseTestCase):
             ["4--user0--", "0--user1--", "0--user2--"],
         )
 
+    def test_flat_ranks__bad__writes_nothing(self):
+        game = self.make_game(ranked=True)
+        users = [self.make_user(username=f"user{i}") for i in range(3)]
+        fixture = self.make_fixture(users=users, game=game)
+        with self.assertRaises(AssertionError):
+            fixture.set_flat_ranks(["1--user0--", "2--user1--", "2--nobody--"])
+        self.assertEqual(fixture.get_flat_ranks(), ["0--user0--", "0--user1--", "0--user2--"])
+
+    def test_flat_ranks__batched(self):
+        game = self.make_game(ranked=True)
+        for players in (3, 12):
+            users = [self.make_user() for _ in range(players)]
+            fixture = self.make_fixture(users=users, game=game)
+            flat = [f"{i}--{user.username}--" for i, user in enumerate(users, start=1)]
+            # Load the ranks and users, then write them all at once.
+            with self.assertNumQueries(2):
+                fixture.set_flat_ranks(flat)
+            self.assertTrue(json.loads(fixture.graph))
+            graph = fixture.graph
+            # Saving the same ranks writes nothing, and keeps the graph.
+            with (
+                self.assertNumQueries(1),
+                mock.patch.object(Fixture, "_build_player_graph") as build,
+            ):
+                fixture.set_flat_ranks(flat)
+            build.assert_not_called()
+            self.assertEqual(fixture.graph, graph)
+
+    def test_move_rank(self):
+        game = self.make_game(ranked=True)
+        users = [self.make_user(username=f"user{i}") for i in range(3)]
+        fixture = self.make_fixture(users=users, game=game)
+        self.assertEqual(fixture.move_rank("user0", 1, ""), {0, 1})
+        self.assertEqual(fixture.move_rank("user1", 2, ""), {0, 2})
+        self.assertIsNone(fixture.graph)
+        # Once every player is ranked, the graph is built.
+        self.assertEqual(fixture.move_rank("user2", 3, ""), {0, 3})
+        self.assertTrue(json.loads(fixture.graph))
+        # Moving a player to their own rank changes nothing.
+        self.assertEqual(fixture.move_rank("user2", 3, ""), set())
+        self.assertEqual(fixture.get_flat_ranks(), ["1--user0--", "2--user1--", "3--user2--"])
+
+    def test_move_rank__team(self):
+        game = self.make_game(ranked=True)
+        users = [self.make_user(username=f"user{i}") for i in range(4)]
+        fixture = self.make_fixture(users=users, game=game)
+        fixture.set_flat_ranks(["1--user0--red", "1--user1--red", "2--user2--", "3--user3--"])
+        # Teammates move with the player, and joining a team brings its players along.
+        self.assertEqual(fixture.move_rank("user0", 3, "red"), {1, 3})
+        self.assertEqual(fixture.move_rank("user2", 2, "red"), {2, 3})
+        self.assertEqual(
+            fixture.get_flat_ranks(),
+            ["2--user0--red", "2--user1--red", "2--user2--red", "3--user3--"],
+        )
+        # The last player cannot join the team too.
+        with self.assertRaises(ValueError):
+            fixture.move_rank("user3", 2, "red")
+        self.assertEqual(fixture.rank_set.get(user__username="user3").team, "")
+
+    def test_move_rank__bad(self):
+        game = self.make_game(ranked=False)
+        users = [self.make_user(username=f"user{i}") for i in range(3)]
+        fixture = self.make_fixture(users=users, game=game)
+        with self.assertRaises(ValueError):
+            fixture.move_rank("user0", 3, "")
+        with self.assertRaises(ValueError):
+            fixture.move_rank("nobody", 1, "")
+        fixture.ended = datetime.datetime.now(tz=datetime.UTC)
+        with self.assertRaises(ValueError):
+            fixture.move_rank("user0", 1, "")
+        self.assertEqual(fixture.get_flat_ranks(), ["0--user0--", "0--user1--", "0--user2--"])
+
     def test_get_max_rank(self):
         game = self.make_game(ranked=True)
         users = [self.make_user(username=f"user{i}") for i in range(5)]
@@ -149,3 +320,70 @@ class TestFixture(base.BaseTestCase):
             self.assertGreater(data["delta"], 0)
             if last_delta is not None:
                 self.assertEqual(data["delta"], last_delta)
+
+    def assert_graph_matches_legacy(self, fixture: Fixture) -> None:
+        fixture.game  # noqa: B018
+        with self.assertNumQueries(1):
+            fixture._build_player_graph()
+        self.assertEqual(
+            sorted(json.loads(fixture.graph), key=lambda edge: (edge["source"], edge["target"])),
+            legacy_player_graph(fixture),
+        )
+
+    def test_build_graph__matches_legacy__ranked(self):
+        users = [self.make_user(score=800 + 25 * i) for i in range(20)]
+        fixture = self.make_fixture(users=users, game=self.make_game(ranked=True), rank_users=True)
+        self.assert_graph_matches_legacy(fixture)
+        # Ties between players of different scores go to the lower scored player.
+        fixture.rank_set.filter(rank__in=[2, 3, 4]).update(rank=2)
+        self.assert_graph_matches_legacy(fixture)
+
+    def test_build_graph__matches_legacy__win_lose(self):
+        users = [self.make_user(score=900 + 10 * i) for i in range(20)]
+        fixture = self.make_fixture(
+            users=users,
+            game=self.make_game(ranked=False, randomness=0.5),
+            rank_users=True,
+        )
+        self.assert_graph_matches_legacy(fixture)
+
+    def test_build_graph__matches_legacy__teams(self):
+        users = [self.make_user(score=1000 + 50 * i) for i in range(8)]
+        fixture = self.make_fixture(users=users, game=self.make_game(ranked=True))
+        for i, user in enumerate(users):
+            fixture.rank_set.filter(user=user).update(rank=i % 3 + 1, team=f"team{i % 3}")
+        self.assert_graph_matches_legacy(fixture)
+
+
+class TestFixtureConcurrency(base.BaseTransactionTestCase):
+    def test_finish__overlapping_fixtures(self):
+        users = [self.make_user() for _ in range(6)]
+        game = self.make_game(ranked=True)
+        fixtures = [
+            self.make_fixture(users=users[:4], game=game, rank_users=True),
+            self.make_fixture(users=users[2:], game=game, rank_users=True),
+        ]
+        barrier = threading.Barrier(len(fixtures) * 2)
+        errors = []
+
+        def finish(fixture: Fixture) -> None:
+            try:
+                fixture = Fixture.objects.get(pk=fixture.pk)
+                barrier.wait()
+                fixture.finish()
+            except Exception as e:  # noqa: BLE001
+                errors.append(e)
+            finally:
+                connection.close()
+
+        # Each fixture is finished twice, as if Finish was tapped twice.
+        threads = [threading.Thread(target=finish, args=(fixture,)) for fixture in fixtures * 2]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(errors, [])
+        # Every score is its start plus the deltas of its ranks, with no update lost.
+        for user in User.objects.filter(pk__in=[u.pk for u in users]):
+            deltas = sum(user.rank_set.values_list("delta", flat=True))
+            self.assertEqual(user.score, 1000 + deltas)
@@ -0,0 +1,64 @@
+import datetime
+
+from django.utils import timezone
+
+from gamenight.games.models import ScorePoint, User, utils
+from tests import base
+
+POINTS = ScorePoint.objects.values_list("user_id", "fixture_id", "at", "score")
+
+
+class TestScorePoint(base.BaseTestCase):
+    def test_finish__appends_points(self):
+        users = [self.make_user() for _ in range(4)]
+        fixtures = self.play_fixtures(users, 6)
+        series = ScorePoint.objects.series()
+        for user in User.objects.filter(pk__in=[u.pk for u in users]):
+            played = [f for f in fixtures if f.rank_set.filter(user=user).exists()]
+            self.assertEqual([at for at, _ in series[user.pk]], [f.ended for f in played])
+            self.assertEqual(series[user.pk][-1][1], user.score)
+
+    def test_replay__rewrites_points(self):
+        users = [self.make_user() for _ in range(4)]
+        fixtures = self.play_fixtures(users, 8)
+        expected = self.snapshot(POINTS)
+        ScorePoint.objects.all().delete()
+        utils.recompute_all_scores()
+        self.assertEqual(self.snapshot(POINTS), expected)
+        utils.replay_scores(since=fixtures[4])
+        self.assertEqual(self.snapshot(POINTS), expected)
+
+    def make_points(self, user: User, scores: list[int], start: datetime.datetime) -> None:
+        game = self.make_game()
+        for i, score in enumerate(scores):
+            ScorePoint.objects.create(
+                user=user,
+                fixture=self.make_fixture(game=game),
+                at=start + datetime.timedelta(minutes=20 * i),
+                score=score,
+            )
+
+    def test_last_points(self):
+        a, b = self.make_user(), self.make_user()
+        start = timezone.now().replace(minute=0, second=0, microsecond=0)
+        self.make_points(a, [1010, 1020, 1030, 1040], start)
+        self.make_points(b, [990], start)
+        series = ScorePoint.objects.last_points(2).series()
+        self.assertEqual([score for _, score in series[a.pk]], [1030, 1040])
+        self.assertEqual([score for _, score in series[b.pk]], [990])
+
+    def test_bucketed(self):
+        user = self.make_user()
+        start = timezone.now().replace(minute=0, second=0, microsecond=0)
+        # Three points an hour.
+        self.make_points(user, [1010, 1020, 1030, 1040, 1050, 1060, 1070], start)
+        series = ScorePoint.objects.filter(user=user).bucketed("hour").series()
+        self.assertEqual([score for _, score in series[user.pk]], [1030, 1060, 1070])
+
+    def test_party_chart__one_query(self):
+        users = [self.make_user() for _ in range(4)]
+        self.play_fixtures(users, 6)
+        with self.assertNumQueries(1):
+            series = ScorePoint.objects.filter(at__gte=timezone.now() - datetime.timedelta(days=1))
+            series = series.bucketed("hour").series()
+        self.assertEqual(set(series), {u.pk for u in users})
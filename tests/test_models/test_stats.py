@@ -0,0 +1,60 @@
+from django import urls
+
+from gamenight.games.models import UserGameStats, utils
+from tests import base
+
+STATS = UserGameStats.objects.values_list(
+    "user_id",
+    "game_id",
+    "played",
+    "wins",
+    "total_delta",
+    "best_delta",
+    "worst_delta",
+)
+
+
+class TestUserGameStats(base.BaseTestCase):
+    def setUp(self):
+        super().setUp()
+        self.users = [self.make_user() for _ in range(5)]
+        self.games = [self.make_game(ranked=True), self.make_game(ranked=False)]
+
+    def test_finish__records_stats(self):
+        fixture = self.play_fixtures(self.users, 1, games=self.games, rotate=5)[0]
+        ranks = {rank.user_id: rank for rank in fixture.rank_set.all()}
+        stats = UserGameStats.objects.filter(game=fixture.game)
+        self.assertEqual(len(stats), 3)
+        for stat in stats:
+            rank = ranks[stat.user_id]
+            self.assertEqual(stat.played, 1)
+            self.assertEqual(stat.wins, int(rank.rank == 1))
+            self.assertEqual(stat.total_delta, rank.delta)
+            self.assertEqual(stat.best_delta, rank.delta)
+            self.assertEqual(stat.worst_delta, rank.delta)
+
+    def test_finish__matches_rebuild(self):
+        self.play_fixtures(self.users, 12, games=self.games, rotate=5)
+        incremental = self.snapshot(STATS)
+        UserGameStats.rebuild()
+        self.assertEqual(self.snapshot(STATS), incremental)
+        self.assertEqual(sum(UserGameStats.objects.values_list("played", flat=True)), 36)
+
+    def test_replay__rebuilds(self):
+        self.play_fixtures(self.users, 6, games=self.games, rotate=5)
+        incremental = self.snapshot(STATS)
+        UserGameStats.objects.all().delete()
+        utils.recompute_all_scores()
+        self.assertEqual(self.snapshot(STATS), incremental)
+
+    def test_win_rate(self):
+        self.assertEqual(UserGameStats(played=0, wins=0).win_rate, 0.0)
+        self.assertEqual(UserGameStats(played=4, wins=1).win_rate, 0.25)
+
+    def test_profile_page(self):
+        fixture = self.play_fixtures(self.users, 1, games=self.games, rotate=5)[0]
+        user = fixture.users.first()
+        self.client.force_login(user)
+        response = self.client.get(urls.reverse("users:detail"))
+        self.assertEqual(response.status_code, 200)
+        self.assertIn(fixture.game.name, response.content.decode())
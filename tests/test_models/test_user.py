@@ -1,6 +1,8 @@
 import datetime
+from unittest import mock
 
-from gamenight.games.models import User
+from gamenight.games.models import Rank, User
+from gamenight.games.models.user import UserBroadcaster, score_broadcasts
 from tests import base
 
 
@@ -19,8 +21,66 @@ class TestUser(base.BaseTestCase):
         self.make_fixture(users=users[:2])
         self.assertEqual(User.available.all().count(), 2)
 
+    def test_available__players_changed(self):
+        users = [self.make_user() for _ in range(4)]
+        fixture = self.make_fixture(users=users[:3])
+        self.assertEqual(User.objects.get(pk=users[0].pk).active_fixture, fixture)
+        fixture.users.remove(users[0])
+        self.assertEqual(set(User.available.all()), {users[0], users[3]})
+        fixture.users.clear()
+        self.assertEqual(User.available.count(), 4)
+        users[3].fixture_set.add(fixture)
+        self.assertEqual(set(User.available.all()), set(users[:3]))
+        Rank.objects.create(fixture=fixture, user=users[0])
+        self.assertEqual(set(User.available.all()), set(users[1:3]))
+        Rank.objects.filter(fixture=fixture, user=users[0]).get().delete()
+        self.assertEqual(set(User.available.all()), set(users[:3]))
+
+    def test_available__finish(self):
+        users = [self.make_user() for _ in range(4)]
+        first = self.make_fixture(users=users[:2], rank_users=True)
+        second = self.make_fixture(users=users[1:3], rank_users=True)
+        self.assertEqual(set(User.available.all()), {users[3]})
+        first.finish()
+        # The second player is still playing another fixture.
+        self.assertEqual(set(User.available.all()), {users[0], users[3]})
+        second.finish()
+        self.assertEqual(User.available.count(), 4)
+
+    def test_available__no_joins(self):
+        with base.capture_queries() as queries:
+            list(User.available.all())
+        self.assertEqual(len(queries), 1)
+        self.assertNotIn("JOIN", queries[0])
+
     def test_set_password(self):
         user = self.make_user()
         user.set_password("123456")
         user.save()
         self.assertNotEqual(user.qrcode, "")
+
+    @mock.patch.object(UserBroadcaster, "send_leaderboard", autospec=True)
+    @mock.patch.object(UserBroadcaster, "send_scores", autospec=True)
+    def test_broadcast_score__coalesced(self, send_scores, send_leaderboard):
+        with self.captureOnCommitCallbacks(execute=True):
+            user = self.make_user(username="user0")
+            for score in (1010, 1020, 1030):
+                user.score = score
+                user.save()
+        send_scores.assert_called_once_with(mock.ANY, {"user0": 1030})
+        send_leaderboard.assert_called_once_with(mock.ANY, {"user0": 1030})
+
+    @mock.patch.object(UserBroadcaster, "send_summary", autospec=True)
+    @mock.patch.object(UserBroadcaster, "send_leaderboard", autospec=True)
+    @mock.patch.object(UserBroadcaster, "send_scores", autospec=True)
+    def test_broadcast_score__suppressed(self, send_scores, send_leaderboard, send_summary):
+        users = [self.make_user(username=f"user{i}") for i in range(3)]
+        with self.captureOnCommitCallbacks(execute=True), score_broadcasts.suppressed():
+            for i, user in enumerate(users):
+                user.score += i + 1
+                user.save()
+        # One summary at the end, rather than a message per user.
+        scores = {"user0": 1001, "user1": 1002, "user2": 1003}
+        send_summary.assert_called_once_with(mock.ANY, scores)
+        send_scores.assert_not_called()
+        send_leaderboard.assert_not_called()
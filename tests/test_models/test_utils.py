@@ -1,6 +1,12 @@
-from gamenight.games.models import utils
+import datetime
+from unittest import mock
+
+from gamenight.games.models import Fixture, Rank, ScoreCheckpoint, User, utils
 from tests import base
 
+# The scores, and the deltas they were reached by.
+SCORES = (User.objects.values_list("pk", "score"), Rank.objects.values_list("pk", "delta"))
+
 
 class TestPlay(base.BaseTestCase):
     def test_play__no_players(self):
@@ -18,3 +24,71 @@ class TestPlay(base.BaseTestCase):
         users = [self.make_user() for _ in range(4)]
         utils.play(game, users)
         self.assertRaises(ValueError, utils.play, game, users)
+
+
+class TestReplayScores(base.BaseTestCase):
+    def test_recompute_all_scores__matches_finish(self):
+        users = [self.make_user() for _ in range(6)]
+        self.play_fixtures(users, 10, players=4)
+        expected = self.snapshot(*SCORES)
+        User.objects.update(score=500)
+        Rank.objects.update(delta=0)
+        utils.recompute_all_scores()
+        self.assertEqual(self.snapshot(*SCORES), expected)
+        self.assertFalse(Fixture.objects.filter(applied=False).exists())
+
+    def test_recompute_all_scores__skips_unranked(self):
+        users = [self.make_user() for _ in range(2)]
+        self.make_fixture(users=users, ended=datetime.datetime.now(tz=datetime.UTC))
+        utils.recompute_all_scores()
+        self.assertEqual(set(User.objects.values_list("score", flat=True)), {User.DEFAULT_SCORE})
+
+    def test_replay_scores__locks_users(self):
+        users = [self.make_user() for _ in range(4)]
+        self.play_fixtures(users, 2, players=4)
+        with base.capture_queries() as queries:
+            utils.replay_scores()
+        locks = [sql for sql in queries if "FOR NO KEY UPDATE" in sql]
+        self.assertEqual(len(locks), 1, queries)
+        self.assertIn('FROM "games_user"', locks[0])
+
+    def test_replay_scores__unchanged(self):
+        users = [self.make_user() for _ in range(4)]
+        self.play_fixtures(users, 2, players=4)
+        with (
+            base.capture_queries() as queries,
+            mock.patch.object(utils.score_broadcasts, "add") as add,
+        ):
+            utils.replay_scores()
+        self.assertFalse([sql for sql in queries if sql.startswith('UPDATE "games_user"')])
+        add.assert_called_once_with()
+
+    def test_replay_scores__broadcasts_summary(self):
+        users = [self.make_user() for _ in range(4)]
+        self.play_fixtures(users, 2, players=4)
+        User.objects.filter(pk=users[0].pk).update(score=0)
+        with (
+            mock.patch.object(utils.score_broadcasts, "_send") as send,
+            self.captureOnCommitCallbacks(execute=True),
+        ):
+            utils.replay_scores()
+        send.assert_called_once_with({users[0].username}, summary=True)
+
+    @mock.patch.object(utils, "CHECKPOINT_INTERVAL", 3)
+    def test_replay_scores__from_checkpoint(self):
+        users = [self.make_user() for _ in range(6)]
+        fixtures = self.play_fixtures(users, 10, players=4)
+        utils.recompute_all_scores()
+        self.assertEqual(ScoreCheckpoint.objects.count(), 3)
+        # Correct the results of a fixture, then replay from the checkpoint before it.
+        corrected = fixtures[7]
+        corrected.rank_set.update(rank=1)
+        Fixture.objects.update(graph=None)
+        utils.replay_scores(since=corrected)
+        replayed = self.snapshot(*SCORES)
+        self.assertEqual(ScoreCheckpoint.objects.count(), 3)
+        # Only the fixtures after the checkpoint (taken after the 6th fixture) were replayed.
+        graphs = dict(Fixture.objects.values_list("pk", "graph"))
+        self.assertEqual([graphs[f.pk] is not None for f in fixtures], [False] * 6 + [True] * 4)
+        utils.recompute_all_scores()
+        self.assertEqual(self.snapshot(*SCORES), replayed)
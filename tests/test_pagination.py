@@ -0,0 +1,141 @@
+import base64
+import datetime
+import html
+import json
+import re
+
+from django import urls
+from django.utils import timezone
+
+from gamenight.games import leaderboard, models, pagination
+from tests import base
+
+
+class TestKeyset(base.BaseTestCase):
+    def test_after__queryset(self):
+        started = timezone.now()
+        fixtures = [self.make_fixture() for _ in range(6)]
+        # Ties on started are broken by id.
+        models.Fixture.objects.filter(pk__in=[f.pk for f in fixtures[:3]]).update(started=started)
+        rows = models.Fixture.objects.order_by("-started", "-id")
+        expected = list(rows)
+        for i, fixture in enumerate(expected):
+            values = pagination.decode_cursor(
+                pagination.encode_cursor(["-started", "-id"], fixture),
+            )
+            self.assertEqual(
+                list(pagination.after(rows, ["-started", "-id"], values)),
+                expected[i + 1 :],
+            )
+
+    def test_after__sequence(self):
+        entries = [
+            leaderboard.Entry(position=1, username="b", score=1200),
+            leaderboard.Entry(position=2, username="a", score=1000),
+            leaderboard.Entry(position=2, username="c", score=1000),
+            leaderboard.Entry(position=4, username="d", score=900),
+        ]
+        for i, entry in enumerate(entries):
+            values = pagination.decode_cursor(
+                pagination.encode_cursor(["-score", "username"], entry),
+            )
+            self.assertEqual(
+                pagination.after(entries, ["-score", "username"], values),
+                entries[i + 1 :],
+            )
+
+    def test_decode_cursor__invalid(self):
+        self.assertIsNone(pagination.decode_cursor("not a cursor"))
+        self.assertIsNone(pagination.decode_cursor(""))
+
+    def test_coerce_cursor(self):
+        fixture = self.make_fixture()
+        rows = models.Fixture.objects.all()
+        key = ["-started", "-id"]
+        values = pagination.decode_cursor(pagination.encode_cursor(key, fixture))
+        self.assertEqual(pagination.coerce_cursor(rows, key, values), [fixture.started, fixture.pk])
+        for invalid in (
+            [],
+            values[:1],
+            [*values, 1],
+            [None, values[1]],
+            ["not a date", values[1]],
+            [values[0], "not a uuid"],
+            [values[0], {"id": 1}],
+        ):
+            self.assertIsNone(pagination.coerce_cursor(rows, key, invalid), invalid)
+
+        entries = [leaderboard.Entry(position=1, username="a", score=1000)]
+        key = ["-score", "username"]
+        self.assertEqual(pagination.coerce_cursor(entries, key, [900, "b"]), [900, "b"])
+        for invalid in ([], [900], ["900", "b"], [900, 1], [900, "b", 1]):
+            self.assertIsNone(pagination.coerce_cursor(entries, key, invalid), invalid)
+
+
+class TestKeysetTables(base.BaseTestCase):
+    def setUp(self):
+        super().setUp()
+        self.client.force_login(self.make_user(username="viewer", score=0))
+
+    def next_url(self, content: str) -> str | None:
+        if match := re.search(r'hx-get="([^"]+)"', content):
+            return html.unescape(match.group(1))
+        return None
+
+    def scroll(self, path: str, pattern: str) -> list[str]:
+        """Load a page, then every page after it the way htmx does, collecting the rows."""
+        content = self.client.get(path).content.decode()
+        rows = re.findall(pattern, content)
+        while url := self.next_url(content):
+            with base.capture_queries() as queries:
+                response = self.client.get(path + url)
+            self.assertEqual(response.status_code, 200)
+            self.assertFalse([q for q in queries if "COUNT(" in q], queries)
+            content = response.content.decode()
+            self.assertNotIn("<table", content)
+            rows.extend(re.findall(pattern, content))
+        return rows
+
+    def test_fixtures(self):
+        game = self.make_game()
+        start = timezone.now()
+        fixtures = [self.make_fixture(game=game) for _ in range(70)]
+        for i, fixture in enumerate(fixtures):
+            # Some fixtures start at the same time.
+            fixture.started = start - datetime.timedelta(minutes=i // 3)
+            fixture.ended = start
+            fixture.save(update_fields=["started", "ended"])
+        expected = [str(f.pk) for f in models.Fixture.objects.order_by("-started", "-id")]
+        rows = self.scroll(urls.reverse("fixtures:ended"), r'<tr data-pk="([^"]+)"')
+        self.assertEqual(rows, expected)
+
+    def test_leaderboard(self):
+        for i in range(65):
+            self.make_user(username=f"user{i:02}", score=1000 + i // 2)
+        leaderboard.refresh()
+        expected = [e.username for e in leaderboard.snapshot()]
+        rows = self.scroll(urls.reverse("users:table"), r'id="([\w-]+)-position"')
+        self.assertEqual(rows, expected)
+
+    def test_invalid_cursor(self):
+        for _ in range(3):
+            self.make_fixture(ended=timezone.now())
+        # Anything that is not a cursor for the table shows the first page.
+        for cursor in (
+            "nonsense",
+            self.encode([]),
+            self.encode(["2024-01-01 00:00:00+00:00"]),
+            self.encode(["not a date", "not a uuid"]),
+            self.encode(["2024-01-01 00:00:00+00:00", "not a uuid"]),
+        ):
+            response = self.client.get(urls.reverse("fixtures:ended"), {"page_after": cursor})
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual(len(re.findall("<tr data-pk", response.content.decode())), 3)
+        for cursor in (self.encode([]), self.encode(["1000", 5])):
+            response = self.client.get(urls.reverse("users:table"), {"page_after": cursor})
+            self.assertEqual(response.status_code, 200)
+            self.assertIn('id="viewer-position"', response.content.decode())
+
+    @staticmethod
+    def encode(values: list) -> str:
+        return base64.urlsafe_b64encode(json.dumps(values).encode()).decode()
@@ -0,0 +1,67 @@
+import io
+import json
+import pathlib
+import tempfile
+import zipfile
+
+from django.core import management
+
+from gamenight.games import qrcodes
+from tests import base
+
+
+class TestQRCodesCommand(base.BaseTestCase):
+    def setUp(self):
+        super().setUp()
+        self.users = []
+        for i in range(5):
+            user = self.make_user(username=f"guest{i}")
+            user.set_password(f"secret{i}")
+            user.save()
+            self.users.append(user)
+        # Users without a password have no QR code.
+        self.make_user(username="nopassword", qrcode="")
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.output = pathlib.Path(directory.name)
+
+    def export(self, *args: str) -> str:
+        stdout = io.StringIO()
+        management.call_command("qrcodes", f"--output={self.output}", *args, stdout=stdout)
+        return stdout.getvalue()
+
+    def test_export(self):
+        self.assertIn("Wrote 5 of 5", self.export("--workers=2"))
+        for user in self.users:
+            png = (self.output / f"{user.username}.png").read_bytes()
+            self.assertEqual(png, qrcodes.render(user.get_qrcode_url()))
+        self.assertFalse((self.output / "nopassword.png").exists())
+        # Nothing is left behind by the atomic writes.
+        self.assertEqual(len(list(self.output.iterdir())), 6)
+        manifest = json.loads((self.output / ".manifest.json").read_text())
+        self.assertEqual(manifest["guest0"], self.users[0].get_qrcode_digest())
+
+    def test_export__changed(self):
+        self.export("--workers=1")
+        self.assertIn("Wrote 0 of 5", self.export("--changed", "--workers=1"))
+        self.users[0].set_password("new secret")
+        self.users[0].save()
+        (self.output / "guest1.png").unlink()
+        self.assertIn("Wrote 2 of 5", self.export("--changed", "--workers=1"))
+        png = (self.output / "guest0.png").read_bytes()
+        self.assertEqual(png, qrcodes.render(self.users[0].get_qrcode_url()))
+
+    def test_export__sheets(self):
+        self.export("--workers=1", f"--sheet={self.output / 'guests.zip'}")
+        with zipfile.ZipFile(self.output / "guests.zip") as archive:
+            self.assertEqual(sorted(archive.namelist()), [f"guest{i}.png" for i in range(5)])
+        self.export("--changed", "--workers=1", f"--sheet={self.output / 'guests.pdf'}")
+        self.assertTrue((self.output / "guests.pdf").read_bytes().startswith(b"%PDF"))
+        with self.assertRaises(management.CommandError):
+            self.export(f"--sheet={self.output / 'guests.txt'}")
+
+    def test_sheets__pages(self):
+        png = qrcodes.render("https://example.com")
+        per_page = qrcodes.SHEET_COLUMNS * qrcodes.SHEET_ROWS
+        self.assertEqual(len(qrcodes.sheets([("guest", png)] * (per_page + 1))), 2)
+        self.assertEqual(qrcodes.sheets([]), [])
@@ -0,0 +1,103 @@
+import datetime
+
+from django import urls
+from django.utils import timezone
+from model_bakery import baker
+
+from gamenight.games import models, recommend
+from gamenight.games.models import utils
+from tests import base
+
+
+class TestRecommend(base.BaseTestCase):
+    def setUp(self):
+        super().setUp()
+        self.alice = self.make_user(username="alice")
+        self.bob = self.make_user(username="bob")
+        self.players = ["alice", "bob"]
+        self.chess = self.make_game(name="Chess", estimated_duration=30)
+        self.checkers = self.make_game(name="Checkers", estimated_duration=30)
+
+    def played(self, game: models.Game, hours_ago: float, **deltas: int) -> models.Fixture:
+        """Record an applied fixture, with the deltas of its players."""
+        fixture = baker.make(
+            "Fixture",
+            game=game,
+            ended=timezone.now() - datetime.timedelta(hours=hours_ago),
+            applied=True,
+        )
+        for username, delta in deltas.items():
+            baker.make(
+                "Rank",
+                fixture=fixture,
+                user=models.User.objects.get(username=username),
+                rank=1 if delta > 0 else 2,
+                delta=delta,
+            )
+        return fixture
+
+    def test_even(self):
+        self.played(self.chess, 48, alice=150, bob=-150)
+        self.played(self.checkers, 48, alice=5, bob=-5)
+        games = [self.chess, self.checkers]
+        self.assertEqual(recommend.recommend(self.players, games), [self.checkers, self.chess])
+
+    def test_fresh(self):
+        self.played(self.chess, 0.5, alice=5, bob=-5)
+        self.played(self.checkers, 48, alice=5, bob=-5)
+        games = [self.chess, self.checkers]
+        self.assertEqual(recommend.recommend(self.players, games), [self.checkers, self.chess])
+        # Players who never played either game have no reason to prefer one.
+        self.make_user(username="carol")
+        self.make_user(username="dave")
+        self.assertEqual(recommend.recommend(["carol", "dave"], games), games)
+
+    def test_short(self):
+        long = self.make_game(name="Epic", estimated_duration=120)
+        games = [long, self.chess]
+        self.assertEqual(recommend.recommend(self.players, games), [self.chess, long])
+
+    def test_top(self):
+        games = [self.make_game(estimated_duration=i) for i in range(1, 11)]
+        recommend.top(self.players, games, k=3)
+        with self.assertNumQueries(0):
+            best = recommend.top(self.players, games, k=3)
+        self.assertEqual([game for game, _ in best], games[:3])
+        scores = [score for _, score in best]
+        self.assertEqual(scores, sorted(scores, reverse=True))
+        self.assertTrue(all(0 <= score <= 1 for score in scores))
+        self.assertEqual(recommend.top([], games, k=3), [])
+
+    def test_refreshed_on_finish(self):
+        games = [self.chess, self.checkers]
+        self.assertEqual(recommend.recommend(self.players, games), [self.chess, self.checkers])
+        history = recommend._history
+        fixture = self.make_fixture(game=self.chess, users=[self.alice, self.bob])
+        fixture.set_flat_ranks(["1--alice--", "2--bob--"])
+        with self.captureOnCommitCallbacks(execute=True):
+            fixture.finish()
+        # Only the newly applied fixture is read.
+        with self.assertNumQueries(1):
+            self.assertEqual(
+                recommend.recommend(self.players, games),
+                [self.checkers, self.chess],
+            )
+        self.assertIs(recommend._history, history)
+        with self.assertNumQueries(0):
+            recommend.recommend(self.players, games)
+
+    def test_rebuilt_on_replay(self):
+        self.played(self.chess, 48, alice=5, bob=-5)
+        recommend.recommend(self.players, [self.chess])
+        history = recommend._history
+        with self.captureOnCommitCallbacks(execute=True):
+            utils.replay_scores()
+        recommend.recommend(self.players, [self.chess])
+        self.assertIsNot(recommend._history, history)
+
+    def test_create_form(self):
+        self.client.force_login(self.alice)
+        self.played(self.chess, 0.5, alice=5, bob=-5)
+        response = self.client.get(urls.reverse("fixtures:create"), {"users": self.players})
+        content = response.content.decode()
+        self.assertLess(content.index("Checkers (~30m)"), content.index("Chess (~30m)"))
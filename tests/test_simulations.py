@@ -1,7 +1,11 @@
+import dataclasses
+import io
 import random
 import statistics
 
-from gamenight.games import models
+from django.core import management
+
+from gamenight.games import models, simulation
 from tests import base
 
 
@@ -38,3 +42,66 @@ class TestSimulations(base.BaseTestCase):
                 fixture.finish()
         errors.append(self.compute_error(true_scores))
         self.assertLessEqual(errors[0], errors[-1])
+
+
+class TestSimulationEngine(base.BaseTestCase):
+    def game_config(self, **kwargs) -> simulation.GameConfig:
+        return simulation.GameConfig.from_game(models.Game(**kwargs))
+
+    def test_rate_fixture__matches_finish(self):
+        for ranked in (True, False):
+            users = [self.make_user(score=score) for score in (900, 1000, 1100, 1250)]
+            game = self.make_game(ranked=ranked, estimated_duration=30, randomness=0.3)
+            fixture = self.make_fixture(game=game, users=users, rank_users=True)
+            fixture.set_flat_ranks(fixture.get_flat_ranks())
+            ranks = {r.user_id: r.rank for r in fixture.rank_set.all()}
+            changes = simulation.rate_fixture(
+                simulation.GameConfig.from_game(game),
+                [ranks[user.pk] for user in users],
+                [user.score for user in users],
+            )
+            fixture.finish()
+            for user, change in zip(users, changes, strict=True):
+                before = user.score
+                user.refresh_from_db()
+                self.assertEqual(user.score - before, change)
+
+    def test_rank_players(self):
+        game = self.game_config(ranked=True)
+        performances = [10.0, 30.0, 20.0]
+        self.assertEqual(simulation.rank_players(game, performances).tolist(), [3, 1, 2])
+        game = self.game_config(ranked=False)
+        self.assertEqual(simulation.rank_players(game, performances).tolist(), [2, 1, 2])
+
+    def test_simulate_season__converges(self):
+        games = [simulation.GameConfig.from_game(game) for game in self.load_game_fixtures()]
+        errors = simulation.simulate_season(games, simulation.Season(rounds=40), seed=0)
+        self.assertEqual(len(errors), 41)
+        self.assertLess(errors[-1], errors[0])
+
+    def test_simulate__parallel(self):
+        game = self.game_config(ranked=True, maximum_players=4)
+        configurations = {"game": [game], "chance": [dataclasses.replace(game, randomness=1.0)]}
+        season = simulation.Season(players=8, rounds=5)
+        serial = simulation.simulate(configurations, season, seasons=4, workers=1)
+        parallel = simulation.simulate(configurations, season, seasons=4, workers=2)
+        self.assertEqual(serial, parallel)
+        self.assertEqual([c.name for c in serial], ["game", "chance"])
+        self.assertEqual(len(serial[0].errors), 6)
+
+    def test_simulate_command(self):
+        stdout = io.StringIO()
+        management.call_command(
+            "simulate",
+            "--seasons=2",
+            "--rounds=2",
+            "--workers=1",
+            "--importance",
+            "20",
+            "40",
+            stdout=stdout,
+        )
+        output = stdout.getvalue()
+        self.assertIn("All games", output)
+        self.assertIn("Wordle (importance=20, randomness=", output)
+        self.assertIn("Wordle (importance=40, randomness=", output)
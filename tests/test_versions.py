@@ -0,0 +1,23 @@
+from django.core.cache import cache
+
+from gamenight.games import versions
+from tests import base
+
+
+class TestVersions(base.BaseTestCase):
+    def test_get(self):
+        version = versions.get("test:version")
+        self.assertEqual(versions.get("test:version"), version)
+        self.assertEqual(versions.bump("test:version"), version + 1)
+        self.assertEqual(versions.get("test:version"), version + 1)
+
+    def test_bump__missing(self):
+        version = versions.bump("test:version")
+        self.assertEqual(versions.get("test:version"), version)
+        cache.clear()
+        self.assertEqual(versions.bump("test:other"), versions.get("test:other"))
+
+    def test_incr(self):
+        self.assertEqual(versions.incr("test:counter"), 1)
+        self.assertEqual(versions.incr("test:counter"), 2)
+        self.assertEqual(versions.incr("test:started", start=10), 11)
@@ -0,0 +1,154 @@
+from unittest import mock
+
+import qrcode
+from django import urls
+
+from gamenight.games import models
+from tests import base
+
+
+class TestFixturePages(base.BaseTestCase):
+    """The fixture pages render in a fixed number of queries, however many rows they show."""
+
+    def setUp(self):
+        super().setUp()
+        self.client.force_login(self.make_user())
+        self.game = self.make_game(minimum_players=2, maximum_players=None, ranked=True)
+
+    def make_fixtures(self, n: int, players: int = 4) -> list[models.Fixture]:
+        users = [self.make_user() for _ in range(players)]
+        fixtures = [
+            self.make_fixture(game=self.game, users=users, rank_users=True) for _ in range(n)
+        ]
+        for fixture in fixtures[: n // 2]:
+            fixture.finish()
+        return fixtures
+
+    def test_fixtures_page(self):
+        # Session, user, then the rows and their players for each table, plus the choices of
+        # the game and user filters. Pages are never counted.
+        for n in [2, 20]:
+            self.make_fixtures(n)
+            with base.capture_queries() as queries:
+                response = self.client.get(urls.reverse("fixtures:table"))
+            self.assertEqual(response.status_code, 200)
+            self.assertLessEqual(len(queries), 8, "\n".join(queries))
+
+    def test_detail_page(self):
+        # Session, user, the fixture with its game, and the ranks with their users.
+        fixture = self.make_fixtures(1, players=12)[0]
+        with self.assertNumQueries(4):
+            response = self.client.get(fixture.get_absolute_url())
+        self.assertEqual(response.status_code, 200)
+        content = response.content.decode()
+        self.assertIn(self.game.name, content)
+        for rank in fixture.rank_set.select_related("user"):
+            self.assertIn(rank.user.username, content)
+
+    def test_get_flat_ranks(self):
+        fixture = self.make_fixtures(1, players=12)[0]
+        with self.assertNumQueries(1):
+            self.assertEqual(len(fixture.get_flat_ranks()), 12)
+
+
+class TestQRCodeImage(base.BaseTestCase):
+    def setUp(self):
+        super().setUp()
+        self.user = self.make_user(username="player")
+        self.user.set_password("secret")
+        self.user.save()
+        self.url = urls.reverse("users:qrcode", kwargs={"username": "player"})
+
+    def test_own(self):
+        self.client.force_login(self.user)
+        with mock.patch("qrcode.make", wraps=qrcode.make) as make:
+            response = self.client.get(self.url)
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual(response["Content-Type"], "image/png")
+            self.assertEqual(response.content, self.user.get_qrcode_png())
+            # The image is rendered once, then served from the cache.
+            make.assert_called_once()
+        not_modified = self.client.get(self.url, headers={"If-None-Match": response["ETag"]})
+        self.assertEqual(not_modified.status_code, 304)
+
+    def test_changed_password(self):
+        self.client.force_login(self.user)
+        etag = self.client.get(self.url)["ETag"]
+        self.user.set_password("another secret")
+        self.user.save()
+        self.client.force_login(self.user)
+        response = self.client.get(self.url, headers={"If-None-Match": etag})
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response["ETag"], etag)
+
+    def test_other_user(self):
+        self.client.force_login(self.make_user())
+        self.assertEqual(self.client.get(self.url).status_code, 404)
+        self.client.force_login(self.make_user(is_staff=True))
+        self.assertEqual(self.client.get(self.url).status_code, 200)
+
+    def test_anonymous(self):
+        self.assertEqual(self.client.get(self.url).status_code, 302)
+
+    def test_profile_page(self):
+        self.client.force_login(self.user)
+        with mock.patch("qrcode.make") as make:
+            response = self.client.get(urls.reverse("users:detail"))
+        self.assertEqual(response.status_code, 200)
+        self.assertIn(self.url, response.content.decode())
+        make.assert_not_called()
+
+
+class TestMoveRank(base.BaseTestCase):
+    def setUp(self):
+        super().setUp()
+        self.client.force_login(self.make_user())
+        users = [self.make_user(username=f"user{i}") for i in range(4)]
+        self.fixture = self.make_fixture(game=self.make_game(ranked=True), users=users)
+        self.url = urls.reverse("fixtures:move", kwargs={"fixture": self.fixture.pk})
+
+    def test_update_page(self):
+        response = self.client.get(
+            urls.reverse("fixtures:update", kwargs={"fixture": self.fixture.pk}),
+        )
+        content = response.content.decode()
+        self.assertIn(f'data-move-url="{self.url}"', content)
+        for rank in range(5):
+            self.assertIn(f'id="rank-group-{rank}"', content)
+
+    def test_move(self):
+        response = self.client.post(self.url, {"username": "user0", "rank": 2, "team": ""})
+        self.assertEqual(response.status_code, 200)
+        content = response.content.decode()
+        # Only the groups the player left and joined are rendered.
+        self.assertEqual(content.count('hx-swap-oob="true"'), 2)
+        self.assertIn('id="rank-group-0"', content)
+        self.assertIn('id="rank-group-2"', content)
+        self.assertIn('value="2--user0--"', content)
+        self.assertEqual(self.fixture.rank_set.get(user__username="user0").rank, 2)
+
+    def test_move__ranks_everyone(self):
+        for i in range(3):
+            self.client.post(self.url, {"username": f"user{i}", "rank": i + 1, "team": ""})
+        # Session, user, fixture, the ranks, then the write, the graph and its deltas (in a
+        # savepoint, under test), and the groups to render.
+        with self.assertNumQueries(11):
+            response = self.client.post(self.url, {"username": "user3", "rank": 4, "team": ""})
+        self.assertEqual(response.status_code, 200)
+        self.fixture.refresh_from_db()
+        self.assertTrue(self.fixture.graph)
+        self.assertNotEqual(self.fixture.rank_set.get(user__username="user0").delta, 0)
+
+    def test_move__unchanged(self):
+        response = self.client.post(self.url, {"username": "user0", "rank": 0, "team": ""})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.content, b"")
+
+    def test_move__bad(self):
+        for data in [
+            {"username": "user0", "rank": 5, "team": ""},
+            {"username": "nobody", "rank": 1, "team": ""},
+            {"username": "user0", "rank": "first", "team": ""},
+        ]:
+            self.assertEqual(self.client.post(self.url, data).status_code, 400)
+        self.assertEqual(self.client.get(self.url).status_code, 405)